@@ -4,27 +4,267 @@ Box Score Scraper
 Fetches comprehensive MLB player statistics for completed games only
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import logging
+import os
 from datetime import datetime, date, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import threading
 import time
 from database import MLBPropsDatabase
 
+try:
+    # orjson parses the large boxscore/schedule payloads several times faster
+    import orjson
+    _loads_json = orjson.loads
+except ImportError:
+    _loads_json = json.loads
+
+try:
+    # Optional on-disk HTTP cache for payloads that never change once a game is final
+    from requests_cache import CachedSession
+except ImportError:
+    CachedSession = None
+
 logger = logging.getLogger(__name__)
 
+# Maximum number of games fetched concurrently. Every game is a handful of
+# blocking HTTP round-trips, so threads overlap the network waits; the request
+# rate itself is paced by REQUEST_RATE_LIMIT.
+MAX_CONCURRENT_GAMES = 5
+
+# Maximum concurrent per-team abbreviation lookups for IDs missing from the cache
+TEAM_LOOKUP_WORKERS = 16
+
+# Outbound request budget shared by all game workers (requests per second)
+REQUEST_RATE_LIMIT = 20
+
+# Maximum game IDs bound into a single IN (...) query; SQLite caps bound
+# variables at 999 on older builds
+SQLITE_IN_CHUNK_SIZE = 900
+
+# SQLite file backing the optional persistent HTTP cache
+HTTP_CACHE_NAME = '.mlb_http_cache'
+
+# Set MLB_HTTP_CACHE=1 to serve repeat fetches of final games from HTTP_CACHE_NAME
+HTTP_CACHE_ENABLED = os.environ.get('MLB_HTTP_CACHE', '') not in ('', '0')
+
+# How long a fetched MLB schedule is reused before it is requested again
+SCHEDULE_CACHE_TTL = 300
+
+# MLB Stats API team IDs and the abbreviations the API reports for them.
+# Team IDs never change, so resolving them locally avoids an API call per
+# team; unknown IDs still fall back to the teams endpoint.
+MLB_TEAM_ABBREVIATIONS: Dict[int, str] = {
+    108: 'LAA', 109: 'AZ', 110: 'BAL', 111: 'BOS', 112: 'CHC',
+    113: 'CIN', 114: 'CLE', 115: 'COL', 116: 'DET', 117: 'HOU',
+    118: 'KC', 119: 'LAD', 120: 'WSH', 121: 'NYM', 133: 'ATH',
+    134: 'PIT', 135: 'SD', 136: 'SEA', 137: 'SF', 138: 'STL',
+    139: 'TB', 140: 'TEX', 141: 'TOR', 142: 'MIN', 143: 'PHI',
+    144: 'ATL', 145: 'CWS', 146: 'MIA', 147: 'NYY', 158: 'MIL',
+}
+
+# Game ID team abbreviations mapped to the ones ESPN's scoreboard uses
+ESPN_TEAM_ABBREVIATIONS: Dict[str, str] = {
+    'LAD': 'lad', 'COL': 'col', 'NYY': 'nyy', 'BOS': 'bos',
+    'TB': 'tb', 'KC': 'kc', 'CLE': 'cle', 'TOR': 'tor',
+    'ATL': 'atl', 'NYM': 'nym', 'CHC': 'chc', 'STL': 'stl',
+    'MIA': 'mia', 'SF': 'sf', 'OAK': 'oak', 'DET': 'det',
+    'HOU': 'hou', 'TEX': 'tex', 'SEA': 'sea', 'LAA': 'laa',
+    'SD': 'sd', 'AZ': 'ari', 'ARI': 'ari', 'MIN': 'min', 'CWS': 'cws',
+    'MIL': 'mil', 'CIN': 'cin', 'PIT': 'pit', 'WSH': 'wsh',
+    'PHI': 'phi', 'BAL': 'bal'
+}
+
+# MLB Stats API statusCode values for finished games: Final, plus the
+# rain-shortened, tied and forfeit variants of a final
+COMPLETED_STATUS_CODES = frozenset({'F', 'FR', 'FT', 'FO'})
+
+
+def _is_completed(status_code: str) -> bool:
+    """Return True if an MLB API statusCode marks a finished game"""
+    return status_code in COMPLETED_STATUS_CODES
+
+
+@lru_cache(maxsize=64)
+def _espn_date_str(game_date: date) -> str:
+    """Format a date as the YYYYMMDD string the ESPN scoreboard expects"""
+    return game_date.strftime("%Y%m%d")
+
+
+def _is_cacheable_response(response) -> bool:
+    """Only persist boxscores and schedules for dates that are already over"""
+    url = response.url
+    if '/boxscore' in url:
+        return True
+    if '/schedule' in url and 'date=' in url:
+        return url.split('date=', 1)[1][:10] < date.today().isoformat()
+    return False
+
+
+def _safe_int(value) -> int:
+    """Safely convert value to int"""
+    try:
+        return int(value) if value is not None else 0
+    except (ValueError, TypeError):
+        return 0
+
+
+def _safe_float(value) -> float:
+    """Safely convert value to float"""
+    try:
+        return float(value) if value is not None else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+# MLB Stats API boxscore stat keys mapped to box_scores columns as
+# (column, api_key, converter); singles are derived from the batting totals
+BATTING_FIELDS = (
+    ('at_bats', 'atBats', _safe_int),
+    ('hits', 'hits', _safe_int),
+    ('runs', 'runs', _safe_int),
+    ('rbi', 'rbi', _safe_int),
+    ('home_runs', 'homeRuns', _safe_int),
+    ('doubles', 'doubles', _safe_int),
+    ('triples', 'triples', _safe_int),
+    ('walks', 'baseOnBalls', _safe_int),
+    ('strikeouts', 'strikeOuts', _safe_int),
+    ('stolen_bases', 'stolenBases', _safe_int),
+    ('caught_stealing', 'caughtStealing', _safe_int),
+    ('total_bases', 'totalBases', _safe_int),
+)
+
+PITCHING_FIELDS = (
+    ('innings_pitched', 'inningsPitched', _safe_float),
+    ('pitching_outs', 'outs', _safe_int),
+    ('hits_allowed', 'hits', _safe_int),
+    ('earned_runs', 'earnedRuns', _safe_int),
+    ('walks_allowed', 'baseOnBalls', _safe_int),
+    ('strikeouts_pitched', 'strikeOuts', _safe_int),
+    ('home_runs_allowed', 'homeRuns', _safe_int),
+)
+
+FIELDING_FIELDS = (
+    ('fielding_assists', 'assists', _safe_int),
+    ('fielding_putouts', 'putOuts', _safe_int),
+    ('fielding_errors', 'errors', _safe_int),
+)
+
+# ESPN roster statistics keys mapped to box_scores columns, same layout as above
+ESPN_BATTING_FIELDS = (
+    ('at_bats', 'atBats', _safe_int),
+    ('hits', 'hits', _safe_int),
+    ('runs', 'runs', _safe_int),
+    ('rbi', 'rbi', _safe_int),
+    ('home_runs', 'homeRuns', _safe_int),
+    ('doubles', 'doubles', _safe_int),
+    ('triples', 'triples', _safe_int),
+    ('walks', 'walks', _safe_int),
+    ('strikeouts', 'strikeouts', _safe_int),
+    ('stolen_bases', 'stolenBases', _safe_int),
+    ('total_bases', 'totalBases', _safe_int),
+)
+
+ESPN_PITCHING_FIELDS = (
+    ('innings_pitched', 'inningsPitched', _safe_float),
+    ('pitching_outs', 'outs', _safe_int),
+    ('hits_allowed', 'hits', _safe_int),
+    ('earned_runs', 'earnedRuns', _safe_int),
+    ('walks_allowed', 'walks', _safe_int),
+    ('strikeouts_pitched', 'strikeouts', _safe_int),
+    ('home_runs_allowed', 'homeRuns', _safe_int),
+)
+
+# Server-side response filter for the boxscore endpoint: only the keys the
+# parser reads, which cuts most of the payload (line scores, notes, info)
+BOXSCORE_FIELDS = ','.join(dict.fromkeys(
+    ['teams', 'away', 'home', 'players', 'person', 'fullName', 'position',
+     'abbreviation', 'stats', 'batting', 'pitching', 'fielding']
+    + [key for _, key, _ in BATTING_FIELDS + PITCHING_FIELDS + FIELDING_FIELDS]
+))
+
+
+class TokenBucket:
+    """Thread-safe token bucket that paces outbound requests"""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Take one token, blocking only while the bucket is empty"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                wait = (1 - self.tokens) / self.rate
+            
+            time.sleep(wait)
+
 
 class MLBBoxScoreScraper:
     """Scrapes MLB box scores and player statistics for completed games"""
     
-    def __init__(self, db: MLBPropsDatabase):
+    def __init__(self, db: MLBPropsDatabase, http_cache: bool = HTTP_CACHE_ENABLED):
         self.db = db
-        self.session = requests.Session()
+        if http_cache and CachedSession is not None:
+            # Past games' payloads are immutable, so backfill re-runs are served from disk
+            self.session = CachedSession(
+                HTTP_CACHE_NAME,
+                backend='sqlite',
+                expire_after=timedelta(days=365),
+                allowable_methods=('GET',),
+                cache_control=False,
+                filter_fn=_is_cacheable_response
+            )
+        else:
+            if http_cache:
+                logger.warning("requests-cache is not installed, HTTP responses will not be cached")
+            self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept-Encoding': 'gzip',
+            'Connection': 'keep-alive'
         })
+        # Keep connections to the MLB/ESPN hosts warm across requests and
+        # retry transient API failures instead of dropping the game
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.3,
+                              status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount('https://', adapter)
         # Cache for team ID to abbreviation lookups to minimize API calls
-        self.team_cache: Dict[int, str] = {}
+        self.team_cache: Dict[int, str] = dict(MLB_TEAM_ABBREVIATIONS)
+        self._teams_loaded = False
+        # Cache of MLB schedule responses keyed by date string: (fetched_at, data, index)
+        self._schedule_cache: Dict[str, Tuple[float, Dict, Dict[str, Dict]]] = {}
+        self._schedule_lock = threading.Lock()
+        # Game IDs known to have box scores stored, keyed by date, so repeated
+        # collections in a long-lived process skip the database check
+        self._completed_games: Dict[date, Set[str]] = {}
+        # Rate limiter applied to every API request
+        self._bucket = TokenBucket(rate=REQUEST_RATE_LIMIT, capacity=REQUEST_RATE_LIMIT)
+    
+    def _http_get(self, url: str, timeout: int):
+        """GET a URL through the shared session once the rate limiter allows it"""
+        self._bucket.acquire()
+        return self.session.get(url, timeout=timeout)
     
     def collect_box_scores_for_date(self, target_date: date, force_update: bool = False) -> Dict[str, Any]:
         """Collect box scores for all completed games on a specific date"""
@@ -54,40 +294,51 @@ class MLBBoxScoreScraper:
         total_players = 0
         error_count = 0
         games_processed = 0
+        all_box_scores: List[Dict] = []
+        collected_game_ids: List[str] = []
         
-        # Try MLB API first, then ESPN as fallback
-        for game_id in games_to_process:
-            try:
-                logger.info(f"Processing game {game_id}")
-                
-                # First check if game is actually completed
-                game_status = self._check_game_completion_status(game_id, target_date)
-                
-                if not game_status['completed']:
-                    logger.info(f"Game {game_id} is not completed yet ({game_status['status']}), skipping")
-                    continue
-                
-                # Try to get box score data
-                box_score_data = self._get_game_box_score(game_id, target_date)
-                
-                if box_score_data:
-                    # Insert box score data into database
-                    inserted_count = self.db.insert_box_score_data(box_score_data)
-                    total_players += inserted_count
-                    games_processed += 1
+        # Fetch games concurrently (MLB API first, then ESPN as fallback); the
+        # results are written from this thread so the database stays single-threaded
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_GAMES) as executor:
+            futures = {
+                game_id: executor.submit(self._process_game, game_id, target_date)
+                for game_id in games_to_process
+            }
+            
+            for game_id, future in futures.items():
+                try:
+                    game_result = future.result()
+                    
+                    if not game_result['completed']:
+                        logger.info(f"Game {game_id} is not completed yet ({game_result['status']}), skipping")
+                        continue
+                    
+                    box_score_data = game_result['box_score_data']
+                    
+                    if box_score_data:
+                        all_box_scores.extend(box_score_data)
+                        collected_game_ids.append(game_id)
+                        games_processed += 1
+                        
+                        logger.info(f"Collected {len(box_score_data)} player stats for game {game_id}")
+                    else:
+                        logger.warning(f"No box score data found for game {game_id}")
+                        error_count += 1
                     
-                    logger.info(f"Collected {inserted_count} player stats for game {game_id}")
-                else:
-                    logger.warning(f"No box score data found for game {game_id}")
+                except Exception as e:
+                    logger.error(f"Error processing game {game_id}: {e}")
                     error_count += 1
-                
-                # Rate limiting
-                time.sleep(0.5)
-                
+                    continue
+        
+        # Insert every collected game's box scores in one batch
+        if all_box_scores:
+            try:
+                total_players = self.db.insert_box_score_data(all_box_scores)
+                self._completed_games.setdefault(target_date, set()).update(collected_game_ids)
             except Exception as e:
-                logger.error(f"Error processing game {game_id}: {e}")
-                error_count += 1
-                continue
+                logger.error(f"Error inserting box scores for {target_date}: {e}")
+                error_count += games_processed
+                games_processed = 0
         
         logger.info(f"Box score collection complete: {games_processed} games, {total_players} players, {error_count} errors")
         
@@ -97,71 +348,46 @@ class MLBBoxScoreScraper:
             'errors': error_count
         }
     
-    def _check_game_completion_status(self, game_id: str, game_date: date) -> Dict[str, Any]:
-        """Check if a game is completed using multiple sources"""
+    def _process_game(self, game_id: str, game_date: date) -> Dict[str, Any]:
+        """Check completion status and fetch box score data for a single game"""
+        logger.info(f"Processing game {game_id}")
         
-        # Try MLB API first
-        mlb_status = self._check_mlb_api_game_status(game_id, game_date)
-        if mlb_status['found']:
-            return mlb_status
+        # One lookup in the cached MLB schedule gives both the completion
+        # status and the gamePk needed for the boxscore request
+        resolved = self._resolve_game(game_id, game_date)
         
-        # Fallback to ESPN
-        espn_status = self._check_espn_game_status(game_id, game_date)
-        if espn_status['found']:
-            return espn_status
+        if resolved:
+            game_pk, game_info, completed = resolved
+            status = game_info.get('status', {}).get('detailedState', '')
+        else:
+            # Not in the MLB schedule, so fall back to ESPN for the status
+            game_pk, game_info = None, None
+            espn_status = self._check_espn_game_status(game_id, game_date)
+            completed = espn_status['completed']
+            status = espn_status['status'] if espn_status['found'] else 'unknown'
         
-        # If not found in either, assume not completed
-        return {
-            'found': False,
-            'completed': False,
-            'status': 'unknown',
-            'source': 'none'
-        }
+        if not completed:
+            return {'completed': False, 'status': status, 'box_score_data': None}
+        
+        # Try to get box score data
+        box_score_data = self._get_game_box_score(game_id, game_date, game_pk, game_info)
+        
+        return {'completed': True, 'status': status, 'box_score_data': box_score_data}
     
-    def _check_mlb_api_game_status(self, game_id: str, game_date: date) -> Dict[str, Any]:
-        """Check game completion status via MLB API"""
+    def _resolve_game(self, game_id: str, game_date: date) -> Optional[Tuple[Optional[int], Dict, bool]]:
+        """Find a game in the MLB API schedule as (gamePk, game_info, completed)"""
         try:
-            date_str = game_date.strftime("%Y-%m-%d")
-            url = f"https://statsapi.mlb.com/api/v1/schedule?sportId=1&date={date_str}"
-            
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Find the specific game
-            for date_info in data.get('dates', []):
-                for game in date_info.get('games', []):
-                    # Get team IDs to fetch abbreviations
-                    away_team_id = game.get('teams', {}).get('away', {}).get('team', {}).get('id')
-                    home_team_id = game.get('teams', {}).get('home', {}).get('team', {}).get('id')
-                    
-                    if away_team_id and home_team_id:
-                        # Get team abbreviations
-                        away_abbr = self._get_team_abbreviation(away_team_id)
-                        home_abbr = self._get_team_abbreviation(home_team_id)
-                        
-                        if f"{away_abbr}@{home_abbr}" == game_id:
-                            game_status = game.get('status', {})
-                            status_code = game_status.get('statusCode', '')
-                            detailed_state = game_status.get('detailedState', '')
-                            
-                            # Game is completed if status code is 'F' (Final)
-                            completed = status_code == 'F'
-                            
-                            return {
-                                'found': True,
-                                'completed': completed,
-                                'status': detailed_state,
-                                'status_code': status_code,
-                                'source': 'mlb_api'
-                            }
-            
-            return {'found': False, 'completed': False, 'status': 'not_found', 'source': 'mlb_api'}
-            
+            game = self._get_schedule_index(game_date).get(game_id)
         except Exception as e:
-            logger.debug(f"MLB API status check failed for {game_id}: {e}")
-            return {'found': False, 'completed': False, 'status': 'error', 'source': 'mlb_api'}
+            logger.debug(f"MLB API schedule lookup failed for {game_id}: {e}")
+            return None
+        
+        if not game:
+            return None
+        
+        completed = _is_completed(game.get('status', {}).get('statusCode', ''))
+        
+        return game.get('gamePk'), game, completed
     
     def _check_espn_game_status(self, game_id: str, game_date: date) -> Dict[str, Any]:
         """Check game completion status via ESPN API"""
@@ -171,35 +397,27 @@ class MLBBoxScoreScraper:
             
             away_team, home_team = game_id.split('@')
             
-            # ESPN team mapping (basic set - can be expanded)
-            espn_teams = {
-                'LAD': 'lad', 'COL': 'col', 'NYY': 'nyy', 'BOS': 'bos',
-                'TB': 'tb', 'KC': 'kc', 'CLE': 'cle', 'TOR': 'tor',
-                'ATL': 'atl', 'NYM': 'nym', 'CHC': 'chc', 'STL': 'stl',
-                'MIA': 'mia', 'SF': 'sf', 'OAK': 'oak', 'DET': 'det',
-                'HOU': 'hou', 'TEX': 'tex', 'SEA': 'sea', 'LAA': 'laa',
-                'SD': 'sd', 'AZ': 'ari', 'ARI': 'ari', 'MIN': 'min', 'CWS': 'cws',
-                'MIL': 'mil', 'CIN': 'cin', 'PIT': 'pit', 'WSH': 'wsh',
-                'PHI': 'phi', 'BAL': 'bal'
-            }
-            
-            espn_away = espn_teams.get(away_team)
-            espn_home = espn_teams.get(home_team)
+            espn_away = ESPN_TEAM_ABBREVIATIONS.get(away_team)
+            espn_home = ESPN_TEAM_ABBREVIATIONS.get(home_team)
             
             if not espn_away or not espn_home:
                 return {'found': False, 'completed': False, 'status': 'team_mapping_failed', 'source': 'espn'}
             
-            date_str = game_date.strftime("%Y%m%d")
+            date_str = _espn_date_str(game_date)
             url = f"https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/scoreboard?dates={date_str}"
             
-            response = self.session.get(url, timeout=10)
+            response = self._http_get(url, timeout=10)
             response.raise_for_status()
             
-            data = response.json()
+            data = _loads_json(response.content)
             
             # Find the specific game
             for game in data.get('events', []):
-                competitors = game.get('competitions', [{}])[0].get('competitors', [])
+                competitions = game.get('competitions')
+                if not competitions:
+                    continue
+                
+                competitors = competitions[0].get('competitors') or ()
                 if len(competitors) != 2:
                     continue
                 
@@ -224,11 +442,13 @@ class MLBBoxScoreScraper:
             logger.debug(f"ESPN status check failed for {game_id}: {e}")
             return {'found': False, 'completed': False, 'status': 'error', 'source': 'espn'}
     
-    def _get_game_box_score(self, game_id: str, game_date: date) -> Optional[List[Dict]]:
+    def _get_game_box_score(self, game_id: str, game_date: date,
+                            game_pk: Optional[int] = None,
+                            game_info: Optional[Dict] = None) -> Optional[List[Dict]]:
         """Get comprehensive box score data for a game"""
         
-        # Try MLB API first (most detailed)
-        box_score_data = self._get_mlb_api_box_score(game_id, game_date)
+        # Try MLB API first (most detailed) when the game is in its schedule
+        box_score_data = self._get_mlb_api_box_score(game_pk, game_info, game_date) if game_pk else None
         if box_score_data:
             logger.debug(f"Got box score from MLB API for {game_id}")
             return box_score_data
@@ -242,58 +462,29 @@ class MLBBoxScoreScraper:
         logger.warning(f"No box score data available for {game_id}")
         return None
     
-    def _get_mlb_api_box_score(self, game_id: str, game_date: date) -> Optional[List[Dict]]:
+    def _get_mlb_api_box_score(self, game_pk: int, game_info: Dict, game_date: date) -> Optional[List[Dict]]:
         """Get box score data from MLB Stats API"""
         try:
-            # First, get the schedule to find the gamePk
-            date_str = game_date.strftime("%Y-%m-%d")
-            schedule_url = f"https://statsapi.mlb.com/api/v1/schedule?sportId=1&date={date_str}"
-            
-            response = self.session.get(schedule_url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Find the specific game and get its gamePk
-            game_pk = None
-            game_info = None
-            
-            for date_info in data.get('dates', []):
-                for game in date_info.get('games', []):
-                    # Get team IDs to fetch abbreviations
-                    away_team_id = game.get('teams', {}).get('away', {}).get('team', {}).get('id')
-                    home_team_id = game.get('teams', {}).get('home', {}).get('team', {}).get('id')
-                    
-                    if away_team_id and home_team_id:
-                        # Get team abbreviations
-                        away_abbr = self._get_team_abbreviation(away_team_id)
-                        home_abbr = self._get_team_abbreviation(home_team_id)
-                        
-                        if f"{away_abbr}@{home_abbr}" == game_id:
-                            game_pk = game.get('gamePk')
-                            game_info = game
-                            break
-                            
-                if game_pk:
-                    break
-            
-            if not game_pk:
-                logger.debug(f"Game {game_id} not found in schedule for {game_date}")
-                return None
-            
-            # Now get the detailed boxscore using the gamePk
+            # Get the detailed boxscore using the gamePk
             boxscore_url = f"https://statsapi.mlb.com/api/v1/game/{game_pk}/boxscore"
             
-            box_response = self.session.get(boxscore_url, timeout=15)
+            box_response = self._http_get(f"{boxscore_url}?fields={BOXSCORE_FIELDS}", timeout=15)
             box_response.raise_for_status()
             
-            boxscore_data = box_response.json()
+            boxscore_data = _loads_json(box_response.content)
+            
+            # Fall back to the full document if the filter stripped the players
+            teams = boxscore_data.get('teams', {})
+            if not any(teams.get(side, {}).get('players') for side in ('away', 'home')):
+                box_response = self._http_get(boxscore_url, timeout=15)
+                box_response.raise_for_status()
+                boxscore_data = _loads_json(box_response.content)
             
             # Parse the boxscore data with game info
             return self._parse_mlb_api_box_score_direct(boxscore_data, game_info, game_date)
             
         except Exception as e:
-            logger.debug(f"MLB API box score failed for {game_id}: {e}")
+            logger.debug(f"MLB API box score failed for game {game_pk}: {e}")
             return None
     
     def _parse_mlb_api_box_score_direct(self, boxscore_data: Dict, game_info: Dict, game_date: date) -> List[Dict]:
@@ -310,7 +501,7 @@ class MLBBoxScoreScraper:
             
             game_id = f"{away_abbr}@{home_abbr}"
             game_status = game_info.get('status', {}).get('detailedState', 'unknown')
-            game_completed = game_info.get('status', {}).get('statusCode', '') == 'F'
+            game_completed = _is_completed(game_info.get('status', {}).get('statusCode', ''))
             
             # Extract player statistics from boxscore
             teams = boxscore_data.get('teams', {})
@@ -322,119 +513,23 @@ class MLBBoxScoreScraper:
                 players = team_data.get('players', {})
                 
                 for player_id, player_info in players.items():
-                    person = player_info.get('person', {})
-                    player_name = person.get('fullName', '')
-                    position = player_info.get('position', {}).get('abbreviation', '')
-                    
                     stats = player_info.get('stats', {})
                     batting = stats.get('batting', {})
                     pitching = stats.get('pitching', {})
                     fielding = stats.get('fielding', {})
                     
-                    # Create box score record
-                    box_score_record = {
-                        'game_id': game_id,
-                        'game_date': game_date,
-                        'player_name': player_name,
-                        'team': team_abbr,
-                        'game_status': game_status,
-                        'game_completed': game_completed,
-                        'position': position,
-                        'data_source': 'mlb_api',
-                        'data_confidence': 0.95
-                    }
-                    
-                    # Add batting stats
-                    if batting:
-                        hits = self._safe_int(batting.get('hits', 0))
-                        doubles = self._safe_int(batting.get('doubles', 0))
-                        triples = self._safe_int(batting.get('triples', 0))
-                        home_runs = self._safe_int(batting.get('homeRuns', 0))
-                        
-                        box_score_record.update({
-                            'at_bats': self._safe_int(batting.get('atBats', 0)),
-                            'hits': hits,
-                            'runs': self._safe_int(batting.get('runs', 0)),
-                            'rbi': self._safe_int(batting.get('rbi', 0)),
-                            'home_runs': home_runs,
-                            'doubles': doubles,
-                            'triples': triples,
-                            'singles': max(0, hits - doubles - triples - home_runs),
-                            'walks': self._safe_int(batting.get('baseOnBalls', 0)),
-                            'strikeouts': self._safe_int(batting.get('strikeOuts', 0)),
-                            'stolen_bases': self._safe_int(batting.get('stolenBases', 0)),
-                            'caught_stealing': self._safe_int(batting.get('caughtStealing', 0)),
-                            'total_bases': self._safe_int(batting.get('totalBases', 0))
-                        })
-                    
-                    # Add pitching stats
-                    if pitching:
-                        box_score_record.update({
-                            'innings_pitched': self._safe_float(pitching.get('inningsPitched', 0.0)),
-                            'pitching_outs': self._safe_int(pitching.get('outs', 0)),
-                            'hits_allowed': self._safe_int(pitching.get('hits', 0)),
-                            'earned_runs': self._safe_int(pitching.get('earnedRuns', 0)),
-                            'walks_allowed': self._safe_int(pitching.get('baseOnBalls', 0)),
-                            'strikeouts_pitched': self._safe_int(pitching.get('strikeOuts', 0)),
-                            'home_runs_allowed': self._safe_int(pitching.get('homeRuns', 0))
-                        })
-                    
-                    # Add fielding stats
-                    if fielding:
-                        box_score_record.update({
-                            'fielding_assists': self._safe_int(fielding.get('assists', 0)),
-                            'fielding_putouts': self._safe_int(fielding.get('putOuts', 0)),
-                            'fielding_errors': self._safe_int(fielding.get('errors', 0))
-                        })
+                    # Only keep players with some stats (played in the game);
+                    # checked before the record is built since most of the
+                    # roster usually did not appear
+                    if not ((batting and _safe_int(batting.get('atBats')) > 0) or
+                            (pitching and _safe_float(pitching.get('inningsPitched')) > 0.0) or
+                            (fielding and _safe_int(fielding.get('putOuts')) > 0)):
+                        continue
                     
-                    # Only add if player has some stats (played in the game)
-                    if (box_score_record.get('at_bats', 0) > 0 or 
-                        box_score_record.get('innings_pitched', 0.0) > 0.0 or
-                        box_score_record.get('fielding_putouts', 0) > 0):
-                        box_scores.append(box_score_record)
-            
-            return box_scores
-            
-        except Exception as e:
-            logger.error(f"Error parsing direct MLB API box score: {e}")
-            return []
-    
-    def _parse_mlb_api_box_score(self, game_data: Dict, game_date: date) -> List[Dict]:
-        """Parse MLB API box score data into standardized format"""
-        try:
-            box_scores = []
-            
-            # Get basic game info with team abbreviations
-            away_team_id = game_data.get('teams', {}).get('away', {}).get('team', {}).get('id')
-            home_team_id = game_data.get('teams', {}).get('home', {}).get('team', {}).get('id')
-            
-            away_abbr = self._get_team_abbreviation(away_team_id) if away_team_id else ''
-            home_abbr = self._get_team_abbreviation(home_team_id) if home_team_id else ''
-            
-            game_id = f"{away_abbr}@{home_abbr}"
-            game_status = game_data.get('status', {}).get('detailedState', 'unknown')
-            game_completed = game_data.get('status', {}).get('statusCode', '') == 'F'
-            
-            # Extract player statistics from boxscore
-            boxscore = game_data.get('boxscore', {})
-            teams = boxscore.get('teams', {})
-            
-            for team_side in ['away', 'home']:
-                team_data = teams.get(team_side, {})
-                # Use the abbreviation we already determined from team IDs
-                team_abbr = away_abbr if team_side == 'away' else home_abbr
-                players = team_data.get('players', {})
-                
-                for player_id, player_info in players.items():
                     person = player_info.get('person', {})
                     player_name = person.get('fullName', '')
                     position = player_info.get('position', {}).get('abbreviation', '')
                     
-                    stats = player_info.get('stats', {})
-                    batting = stats.get('batting', {})
-                    pitching = stats.get('pitching', {})
-                    fielding = stats.get('fielding', {})
-                    
                     # Create box score record
                     box_score_record = {
                         'game_id': game_id,
@@ -450,57 +545,33 @@ class MLBBoxScoreScraper:
                     
                     # Add batting stats
                     if batting:
-                        hits = self._safe_int(batting.get('hits', 0))
-                        doubles = self._safe_int(batting.get('doubles', 0))
-                        triples = self._safe_int(batting.get('triples', 0))
-                        home_runs = self._safe_int(batting.get('homeRuns', 0))
-                        
-                        box_score_record.update({
-                            'at_bats': self._safe_int(batting.get('atBats', 0)),
-                            'hits': hits,
-                            'runs': self._safe_int(batting.get('runs', 0)),
-                            'rbi': self._safe_int(batting.get('rbi', 0)),
-                            'home_runs': home_runs,
-                            'doubles': doubles,
-                            'triples': triples,
-                            'singles': max(0, hits - doubles - triples - home_runs),
-                            'walks': self._safe_int(batting.get('baseOnBalls', 0)),
-                            'strikeouts': self._safe_int(batting.get('strikeOuts', 0)),
-                            'stolen_bases': self._safe_int(batting.get('stolenBases', 0)),
-                            'caught_stealing': self._safe_int(batting.get('caughtStealing', 0)),
-                            'total_bases': self._safe_int(batting.get('totalBases', 0))
-                        })
+                        get = batting.get
+                        for field, key, convert in BATTING_FIELDS:
+                            box_score_record[field] = convert(get(key))
+                        box_score_record['singles'] = max(
+                            0,
+                            box_score_record['hits'] - box_score_record['doubles']
+                            - box_score_record['triples'] - box_score_record['home_runs']
+                        )
                     
                     # Add pitching stats
                     if pitching:
-                        box_score_record.update({
-                            'innings_pitched': self._safe_float(pitching.get('inningsPitched', 0.0)),
-                            'pitching_outs': self._safe_int(pitching.get('outs', 0)),
-                            'hits_allowed': self._safe_int(pitching.get('hits', 0)),
-                            'earned_runs': self._safe_int(pitching.get('earnedRuns', 0)),
-                            'walks_allowed': self._safe_int(pitching.get('baseOnBalls', 0)),
-                            'strikeouts_pitched': self._safe_int(pitching.get('strikeOuts', 0)),
-                            'home_runs_allowed': self._safe_int(pitching.get('homeRuns', 0))
-                        })
+                        get = pitching.get
+                        for field, key, convert in PITCHING_FIELDS:
+                            box_score_record[field] = convert(get(key))
                     
                     # Add fielding stats
                     if fielding:
-                        box_score_record.update({
-                            'fielding_assists': self._safe_int(fielding.get('assists', 0)),
-                            'fielding_putouts': self._safe_int(fielding.get('putOuts', 0)),
-                            'fielding_errors': self._safe_int(fielding.get('errors', 0))
-                        })
+                        get = fielding.get
+                        for field, key, convert in FIELDING_FIELDS:
+                            box_score_record[field] = convert(get(key))
                     
-                    # Only add if player has some stats (played in the game)
-                    if (box_score_record.get('at_bats', 0) > 0 or 
-                        box_score_record.get('innings_pitched', 0.0) > 0.0 or
-                        box_score_record.get('fielding_putouts', 0) > 0):
-                        box_scores.append(box_score_record)
+                    box_scores.append(box_score_record)
             
             return box_scores
             
         except Exception as e:
-            logger.error(f"Error parsing MLB API box score: {e}")
+            logger.error(f"Error parsing direct MLB API box score: {e}")
             return []
     
     def _get_espn_box_score(self, game_id: str, game_date: date) -> Optional[List[Dict]]:
@@ -511,35 +582,27 @@ class MLBBoxScoreScraper:
             
             away_team, home_team = game_id.split('@')
             
-            # ESPN team mapping (basic set)
-            espn_teams = {
-                'LAD': 'lad', 'COL': 'col', 'NYY': 'nyy', 'BOS': 'bos',
-                'TB': 'tb', 'KC': 'kc', 'CLE': 'cle', 'TOR': 'tor',
-                'ATL': 'atl', 'NYM': 'nym', 'CHC': 'chc', 'STL': 'stl',
-                'MIA': 'mia', 'SF': 'sf', 'OAK': 'oak', 'DET': 'det',
-                'HOU': 'hou', 'TEX': 'tex', 'SEA': 'sea', 'LAA': 'laa',
-                'SD': 'sd', 'ARI': 'ari', 'MIN': 'min', 'CWS': 'cws',
-                'MIL': 'mil', 'CIN': 'cin', 'PIT': 'pit', 'WSH': 'wsh',
-                'PHI': 'phi', 'BAL': 'bal'
-            }
-            
-            espn_away = espn_teams.get(away_team)
-            espn_home = espn_teams.get(home_team)
+            espn_away = ESPN_TEAM_ABBREVIATIONS.get(away_team)
+            espn_home = ESPN_TEAM_ABBREVIATIONS.get(home_team)
             
             if not espn_away or not espn_home:
                 return None
             
-            date_str = game_date.strftime("%Y%m%d")
+            date_str = _espn_date_str(game_date)
             url = f"https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/scoreboard?dates={date_str}"
             
-            response = self.session.get(url, timeout=15)
+            response = self._http_get(url, timeout=15)
             response.raise_for_status()
             
-            data = response.json()
+            data = _loads_json(response.content)
             
             # Find the specific game
             for game in data.get('events', []):
-                competitors = game.get('competitions', [{}])[0].get('competitors', [])
+                competitions = game.get('competitions')
+                if not competitions:
+                    continue
+                
+                competitors = competitions[0].get('competitors') or ()
                 if len(competitors) != 2:
                     continue
                 
@@ -563,8 +626,8 @@ class MLBBoxScoreScraper:
             game_status = game_data.get('status', {}).get('type', {}).get('name', 'unknown')
             game_completed = game_data.get('status', {}).get('type', {}).get('completed', False)
             
-            competition = game_data.get('competitions', [{}])[0]
-            competitors = competition.get('competitors', [])
+            competitions = game_data.get('competitions')
+            competitors = (competitions[0].get('competitors') or ()) if competitions else ()
             
             # Get team lineups and player stats
             for competitor in competitors:
@@ -595,39 +658,21 @@ class MLBBoxScoreScraper:
                     for stat_category in stats:
                         category_name = stat_category.get('name', '')
                         category_stats = stat_category.get('stats', {})
+                        get = category_stats.get
                         
                         if category_name == 'batting':
-                            hits = self._safe_int(category_stats.get('hits', 0))
-                            doubles = self._safe_int(category_stats.get('doubles', 0))
-                            triples = self._safe_int(category_stats.get('triples', 0))
-                            home_runs = self._safe_int(category_stats.get('homeRuns', 0))
-                            
-                            box_score_record.update({
-                                'at_bats': self._safe_int(category_stats.get('atBats', 0)),
-                                'hits': hits,
-                                'runs': self._safe_int(category_stats.get('runs', 0)),
-                                'rbi': self._safe_int(category_stats.get('rbi', 0)),
-                                'home_runs': home_runs,
-                                'doubles': doubles,
-                                'triples': triples,
-                                'singles': max(0, hits - doubles - triples - home_runs),
-                                'walks': self._safe_int(category_stats.get('walks', 0)),
-                                'strikeouts': self._safe_int(category_stats.get('strikeouts', 0)),
-                                'stolen_bases': self._safe_int(category_stats.get('stolenBases', 0)),
-                                'total_bases': self._safe_int(category_stats.get('totalBases', 0))
-                            })
+                            for field, key, convert in ESPN_BATTING_FIELDS:
+                                box_score_record[field] = convert(get(key))
+                            box_score_record['singles'] = max(
+                                0,
+                                box_score_record['hits'] - box_score_record['doubles']
+                                - box_score_record['triples'] - box_score_record['home_runs']
+                            )
                             has_stats = True
                             
                         elif category_name == 'pitching':
-                            box_score_record.update({
-                                'innings_pitched': self._safe_float(category_stats.get('inningsPitched', 0.0)),
-                                'pitching_outs': self._safe_int(category_stats.get('outs', 0)),
-                                'hits_allowed': self._safe_int(category_stats.get('hits', 0)),
-                                'earned_runs': self._safe_int(category_stats.get('earnedRuns', 0)),
-                                'walks_allowed': self._safe_int(category_stats.get('walks', 0)),
-                                'strikeouts_pitched': self._safe_int(category_stats.get('strikeouts', 0)),
-                                'home_runs_allowed': self._safe_int(category_stats.get('homeRuns', 0))
-                            })
+                            for field, key, convert in ESPN_PITCHING_FIELDS:
+                                box_score_record[field] = convert(get(key))
                             has_stats = True
                     
                     # Only add if player has some stats (played in the game)
@@ -653,30 +698,63 @@ class MLBBoxScoreScraper:
             
             return [row[0] for row in cursor.fetchall()]
     
-    def _safe_int(self, value) -> int:
-        """Safely convert value to int"""
-        try:
-            return int(value) if value is not None else 0
-        except (ValueError, TypeError):
-            return 0
+    def _get_schedule(self, game_date: date) -> Dict:
+        """Get the MLB API schedule for a date, reusing a recent response if available"""
+        return self._get_cached_schedule(game_date)[1]
     
-    def _safe_float(self, value) -> float:
-        """Safely convert value to float"""
-        try:
-            return float(value) if value is not None else 0.0
-        except (ValueError, TypeError):
-            return 0.0
+    def _get_schedule_index(self, game_date: date) -> Dict[str, Dict]:
+        """Get the MLB API schedule games for a date keyed by 'AWAY@HOME' game ID"""
+        return self._get_cached_schedule(game_date)[2]
     
-    def _get_completed_games_from_mlb_api(self, target_date: date) -> List[str]:
-        """Get all completed games for a date directly from MLB API"""
-        try:
-            date_str = target_date.strftime("%Y-%m-%d")
+    def _get_cached_schedule(self, game_date: date) -> Tuple[float, Dict, Dict[str, Dict]]:
+        """Return the (fetched_at, schedule, index) cache entry for a date, refreshing it when stale"""
+        date_str = game_date.isoformat()
+        
+        with self._schedule_lock:
+            cached = self._schedule_cache.get(date_str)
+            if cached and time.monotonic() - cached[0] < SCHEDULE_CACHE_TTL:
+                return cached
+            
             url = f"https://statsapi.mlb.com/api/v1/schedule?sportId=1&date={date_str}"
             
-            response = self.session.get(url, timeout=10)
+            response = self._http_get(url, timeout=10)
             response.raise_for_status()
             
-            data = response.json()
+            data = _loads_json(response.content)
+            cached = (time.monotonic(), data, self._build_schedule_index(data))
+            self._schedule_cache[date_str] = cached
+            return cached
+    
+    def _build_schedule_index(self, schedule_data: Dict) -> Dict[str, Dict]:
+        """Map each scheduled game's 'AWAY@HOME' ID to its schedule entry"""
+        index = {}
+        
+        team_ids = {
+            game.get('teams', {}).get(side, {}).get('team', {}).get('id')
+            for date_info in schedule_data.get('dates', [])
+            for game in date_info.get('games', [])
+            for side in ('away', 'home')
+        }
+        team_ids.discard(None)
+        self._prefetch_team_abbreviations(team_ids)
+        
+        for date_info in schedule_data.get('dates', []):
+            for game in date_info.get('games', []):
+                away_team_id = game.get('teams', {}).get('away', {}).get('team', {}).get('id')
+                home_team_id = game.get('teams', {}).get('home', {}).get('team', {}).get('id')
+                
+                if away_team_id and home_team_id:
+                    away_abbr = self._get_team_abbreviation(away_team_id)
+                    home_abbr = self._get_team_abbreviation(home_team_id)
+                    # Keep the first game of a doubleheader, as the linear scan did
+                    index.setdefault(f"{away_abbr}@{home_abbr}", game)
+        
+        return index
+    
+    def _get_completed_games_from_mlb_api(self, target_date: date) -> List[str]:
+        """Get all completed games for a date directly from MLB API"""
+        try:
+            data = self._get_schedule(target_date)
             completed_games = []
             
             for date_info in data.get('dates', []):
@@ -684,7 +762,7 @@ class MLBBoxScoreScraper:
                     # Check if game is completed
                     status_code = game.get('status', {}).get('statusCode', '')
                     
-                    if status_code == 'F':  # Final
+                    if _is_completed(status_code):
                         # Get team abbreviations
                         away_team_id = game.get('teams', {}).get('away', {}).get('team', {}).get('id')
                         home_team_id = game.get('teams', {}).get('home', {}).get('team', {}).get('id')
@@ -706,23 +784,32 @@ class MLBBoxScoreScraper:
     
     def _filter_games_without_box_scores(self, games: List[str], target_date: date) -> List[str]:
         """Filter out games that already have box scores in the database"""
+        known_games = self._completed_games.setdefault(target_date, set())
+        games = [game_id for game_id in games if game_id not in known_games]
+        
+        if not games:
+            return []
+        
         try:
-            games_without_scores = []
-            
-            for game_id in games:
-                # Check if we already have box scores for this game
-                with self.db.get_connection() as conn:
-                    cursor = conn.execute("""
-                        SELECT COUNT(*) FROM box_scores 
-                        WHERE game_id = ? AND game_date = ?
-                    """, (game_id, target_date))
-                    
-                    count = cursor.fetchone()[0]
+            stored_games = set()
+            
+            with self.db.get_connection() as conn:
+                # One query per chunk keeps the IN list under SQLite's variable limit
+                for start in range(0, len(games), SQLITE_IN_CHUNK_SIZE):
+                    chunk = games[start:start + SQLITE_IN_CHUNK_SIZE]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor = conn.execute(f"""
+                        SELECT DISTINCT game_id FROM box_scores
+                        WHERE game_date = ? AND game_id IN ({placeholders})
+                    """, (target_date, *chunk))
                     
-                    if count == 0:
-                        games_without_scores.append(game_id)
-                    else:
-                        logger.debug(f"Game {game_id} already has {count} box score records")
+                    stored_games.update(row[0] for row in cursor)
+            
+            known_games.update(stored_games)
+            games_without_scores = [game_id for game_id in games if game_id not in stored_games]
+            
+            if stored_games:
+                logger.debug(f"{len(stored_games)} games already have box score records")
             
             return games_without_scores
             
@@ -730,6 +817,37 @@ class MLBBoxScoreScraper:
             logger.error(f"Error filtering games: {e}")
             return games  # Return all games if filtering fails
     
+    def _load_team_abbreviations(self):
+        """Populate the team cache from a single MLB API request for all MLB teams"""
+        self._teams_loaded = True
+        try:
+            url = "https://statsapi.mlb.com/api/v1/teams?sportId=1"
+            response = self._http_get(url, timeout=10)
+            response.raise_for_status()
+
+            data = _loads_json(response.content)
+            for team in data.get('teams', []):
+                if team.get('id') and team.get('abbreviation'):
+                    self.team_cache[team['id']] = team['abbreviation']
+
+        except Exception as e:
+            logger.debug(f"Failed to load MLB team abbreviations: {e}")
+
+    def _prefetch_team_abbreviations(self, team_ids: Set[int]):
+        """Resolve any uncached team IDs up front, overlapping the per-team API requests"""
+        missing = [team_id for team_id in team_ids if team_id not in self.team_cache]
+        if not missing:
+            return
+
+        if not self._teams_loaded:
+            self._load_team_abbreviations()
+            missing = [team_id for team_id in missing if team_id not in self.team_cache]
+            if not missing:
+                return
+
+        with ThreadPoolExecutor(max_workers=min(TEAM_LOOKUP_WORKERS, len(missing))) as executor:
+            list(executor.map(self._get_team_abbreviation, missing))
+
     def _get_team_abbreviation(self, team_id: int) -> str:
         """Get team abbreviation from team ID using MLB API with caching"""
         try:
@@ -737,11 +855,18 @@ class MLBBoxScoreScraper:
             if team_id in self.team_cache:
                 return self.team_cache[team_id]
 
+            # Unknown team: refresh every MLB team in one request before
+            # falling back to a per-team lookup
+            if not self._teams_loaded:
+                self._load_team_abbreviations()
+                if team_id in self.team_cache:
+                    return self.team_cache[team_id]
+
             url = f"https://statsapi.mlb.com/api/v1/teams/{team_id}"
-            response = self.session.get(url, timeout=5)
+            response = self._http_get(url, timeout=5)
             response.raise_for_status()
 
-            data = response.json()
+            data = _loads_json(response.content)
             teams = data.get('teams', [])
 
             if teams:
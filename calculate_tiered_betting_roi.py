@@ -5,8 +5,23 @@ Enhanced version with tiered betting amounts based on odds ranges
 """
 import sqlite3
 import re
+import numpy as np
 from database import MLBPropsDatabase
 
+# American odds in parentheses, e.g. "1.5 (+150)", for strings the fast scan can't read
+ODDS_PAREN_RE = re.compile(r'\(([+-]\d+)\)')
+
+# Upper bounds (inclusive) of the positive odds tiers and the stake for each:
+# up to +250 -> $100, +500 -> $50, +750 -> $25, above +750 -> $15
+POSITIVE_ODDS_TIER_BOUNDS = np.array([250, 500, 750])
+POSITIVE_ODDS_TIER_STAKES = np.array([100.0, 50.0, 25.0, 15.0])
+
+def _signed_int(text):
+    """Return text as an int if it is a sign followed by digits, else None"""
+    if text[:1] in ('+', '-') and text[1:].isdecimal():
+        return int(text)
+    return None
+
 def parse_odds(odds_string):
     """Parse American odds string to numeric value"""
     if not odds_string or odds_string.strip() == '':
@@ -14,22 +29,21 @@ def parse_odds(odds_string):
         
     # Look for American odds format in parentheses (+150, -110, etc.)
     # Format is typically "1.5 (+150)" or "2.5 (-110)"
-    match = re.search(r'\(([+-]\d+)\)', odds_string)
-    if match:
-        try:
+    start = odds_string.find('(')
+    if start >= 0:
+        end = odds_string.find(')', start)
+        if end > start:
+            odds_value = _signed_int(odds_string[start + 1:end])
+            if odds_value is not None:
+                return odds_value
+        
+        # Unusual shape (e.g. several parentheses), let the regex find the odds
+        match = ODDS_PAREN_RE.search(odds_string)
+        if match:
             return int(match.group(1))
-        except ValueError:
-            return None
     
     # Fallback: look for standalone odds format
-    match = re.search(r'^([+-]\d+)$', odds_string.strip())
-    if match:
-        try:
-            return int(match.group(1))
-        except ValueError:
-            return None
-    
-    return None
+    return _signed_int(odds_string.strip())
 
 def calculate_suggested_stake_tiered(odds_value):
     """Calculate suggested stake based on tiered odds ranges
@@ -90,6 +104,24 @@ def calculate_roi(profit_loss, stake):
     
     return (profit_loss / stake) * 100
 
+def calculate_tiered_results(odds_values, bets_won):
+    """Vectorized tiered stake, profit/loss and ROI for non-zero American odds
+    Returns (stakes, profit_losses, rois) arrays matching
+    calculate_suggested_stake_tiered, calculate_profit_loss and calculate_roi
+    """
+    odds = np.asarray(odds_values, dtype=np.float64)
+    won = np.asarray(bets_won, dtype=bool)
+    
+    # Positive odds map to a tier by how many upper bounds they exceed;
+    # negative odds bet enough to win $100
+    tiers = np.searchsorted(POSITIVE_ODDS_TIER_BOUNDS, odds, side='left')
+    stakes = np.where(odds < 0, -odds, POSITIVE_ODDS_TIER_STAKES[tiers])
+    winnings = np.where(odds > 0, odds / 100, 100 / np.abs(odds)) * stakes
+    profit_losses = np.where(won, winnings, -stakes)
+    rois = profit_losses / stakes * 100
+    
+    return stakes, profit_losses, rois
+
 def add_roi_columns_to_bet_results():
     """Add ROI tracking columns to bet_results table"""
     
@@ -127,6 +159,10 @@ def add_roi_columns_to_bet_results():
         except sqlite3.OperationalError:
             print("ℹ️  roi_percentage column already exists")
         
+        # Refresh planner statistics so the bet_results/props joins below use
+        # the prop_id and scrape_date indexes
+        conn.execute("ANALYZE")
+        
         conn.commit()
 
 def calculate_tiered_roi_for_all_bets():
@@ -159,42 +195,40 @@ def calculate_tiered_roi_for_all_bets():
         print(f"Found {total_bets:,} resolved bets to process")
         print()
         
-        for i, bet in enumerate(bets_to_process):
+        # Pick each bet's odds and outcome from the suggested side in one
+        # vectorized pass; NEUTRAL and unknown suggestions drop out here
+        suggested = np.array([bet[2] for bet in bets_to_process], dtype=object)
+        is_over = suggested == 'OVER'
+        is_under = suggested == 'UNDER'
+        is_neutral = suggested == 'NEUTRAL'
+        
+        over_lines = np.array([bet[3] for bet in bets_to_process], dtype=object)
+        under_lines = np.array([bet[4] for bet in bets_to_process], dtype=object)
+        over_won = np.array([bet[5] == 'win' for bet in bets_to_process], dtype=bool)
+        under_won = np.array([bet[6] == 'win' for bet in bets_to_process], dtype=bool)
+        
+        odds_strings = np.where(is_over, over_lines, under_lines)
+        won = np.where(is_over, over_won, under_won)
+        
+        neutral_count = int(is_neutral.sum())
+        error_count += int((~(is_over | is_under | is_neutral)).sum())
+        
+        # Parse the odds of every OVER/UNDER bet; the numeric work is done in
+        # one vectorized pass afterwards
+        positions = []
+        bet_result_ids = []
+        odds_values = []
+        
+        for i in np.flatnonzero(is_over | is_under).tolist():
             try:
-                bet_result_id = bet[0]
-                suggested_bet = bet[2]
-                over_line = bet[3]
-                under_line = bet[4]
-                over_result = bet[5]
-                under_result = bet[6]
-                existing_stake = bet[7]
-                existing_profit = bet[8]
-                
-                # Skip if already calculated (and we're not recalculating)
-                # For this run, let's recalculate to update with new tiered amounts
-                
-                # Determine which odds to use based on suggested bet
-                if suggested_bet == 'OVER':
-                    odds_string = over_line
-                    bet_won = (over_result == 'win')
-                elif suggested_bet == 'UNDER':
-                    odds_string = under_line
-                    bet_won = (under_result == 'win')
-                elif suggested_bet == 'NEUTRAL':
-                    # Skip neutral bets - no clear betting recommendation
-                    neutral_count += 1
-                    continue
-                else:
-                    # Unknown suggested bet type
-                    error_count += 1
-                    continue
+                odds_string = odds_strings[i]
                 
                 # Check if odds string exists
                 if not odds_string or odds_string.strip() == '':
                     missing_odds_count += 1
                     continue
                 
-                # Parse odds and calculate stake
+                # Parse odds
                 odds_value = parse_odds(odds_string)
                 if odds_value is None:
                     odds_parse_errors += 1
@@ -202,46 +236,49 @@ def calculate_tiered_roi_for_all_bets():
                         print(f"  ⚠️  Failed to parse odds: '{odds_string}'")
                     continue
                 
-                suggested_stake = calculate_suggested_stake_tiered(odds_value)
-                if suggested_stake is None:
-                    error_count += 1
-                    continue
-                
-                # Calculate profit/loss
-                profit_loss = calculate_profit_loss(odds_value, suggested_stake, bet_won)
-                if profit_loss is None:
+                # Odds of 0 have no stake (shouldn't happen but handle it)
+                if odds_value == 0:
                     error_count += 1
                     continue
                 
-                # Calculate ROI
-                roi = calculate_roi(profit_loss, suggested_stake)
-                
-                # Update the bet_results record
-                cursor = conn.execute("""
-                    UPDATE bet_results 
-                    SET suggested_stake = ?, profit_loss = ?, roi_percentage = ?
-                    WHERE id = ?
-                """, (suggested_stake, profit_loss, roi, bet_result_id))
-                
-                updated_count += 1
-                
-                # Show progress for different stake tiers
-                if i < 5 or (i + 1) % 1000 == 0:
-                    result_emoji = "✅" if bet_won else "❌"
-                    print(f"  {i+1:,}/{total_bets:,} {result_emoji} {suggested_bet} bet")
-                    print(f"    Odds: {odds_value:+d} | Stake: ${suggested_stake:.0f} | P/L: ${profit_loss:+.0f} | ROI: {roi:+.1f}%")
-                    if i >= 4 and (i + 1) % 1000 != 0:
-                        print("    ... (showing every 1000th update)")
-                    print()
+                positions.append(i)
+                bet_result_ids.append(bets_to_process[i][0])
+                odds_values.append(odds_value)
                 
             except Exception as e:
                 error_count += 1
                 if error_count <= 3:  # Show first few general errors
-                    print(f"  Error processing bet {bet[0]}: {e}")
+                    print(f"  Error processing bet {bets_to_process[i][0]}: {e}")
+        
+        bets_won = won[positions]
+        
+        stakes, profits, rois = calculate_tiered_results(odds_values, bets_won)
+        updates = list(zip(stakes.tolist(), profits.tolist(), rois.tolist(), bet_result_ids))
+        updated_count = len(updates)
         
-        # Commit all changes
+        # Keep the first few and every 1000th bet as progress samples
+        row_numbers = np.asarray(positions, dtype=np.int64) + 1
+        samples = np.flatnonzero((row_numbers <= 5) | (row_numbers % 1000 == 0)).tolist()
+        
+        # Apply every update in one batch and commit once
+        conn.executemany("""
+            UPDATE bet_results 
+            SET suggested_stake = ?, profit_loss = ?, roi_percentage = ?
+            WHERE id = ?
+        """, updates)
         conn.commit()
     
+    # Show progress for different stake tiers
+    for j in samples:
+        i = positions[j]
+        suggested_stake, profit_loss, roi, _ = updates[j]
+        result_emoji = "✅" if bets_won[j] else "❌"
+        print(f"  {i+1:,}/{total_bets:,} {result_emoji} {suggested[i]} bet")
+        print(f"    Odds: {odds_values[j]:+d} | Stake: ${suggested_stake:.0f} | P/L: ${profit_loss:+.0f} | ROI: {roi:+.1f}%")
+        if i == 4:
+            print("    ... (showing every 1000th update)")
+        print()
+    
     print(f"✅ TIERED ROI CALCULATION COMPLETE!")
     print(f"  Bets updated: {updated_count:,}")
     print(f"  Skipped - NEUTRAL bets: {neutral_count:,}")
@@ -261,30 +298,6 @@ def analyze_tiered_betting_performance():
     with sqlite3.connect('mlb_props.db') as conn:
         conn.row_factory = sqlite3.Row
         
-        # Analyze by stake amount (which corresponds to odds tiers)
-        cursor = conn.execute('''
-            SELECT 
-                br.suggested_stake,
-                COUNT(*) as total_bets,
-                SUM(br.suggested_stake) as total_staked,
-                SUM(br.profit_loss) as total_profit_loss,
-                ROUND(AVG(br.roi_percentage), 1) as avg_roi,
-                ROUND(SUM(br.profit_loss) / SUM(br.suggested_stake) * 100, 1) as overall_roi,
-                SUM(CASE WHEN br.profit_loss > 0 THEN 1 ELSE 0 END) as winning_bets,
-                ROUND(SUM(CASE WHEN br.profit_loss > 0 THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 1) as win_rate
-            FROM bet_results br
-            JOIN props p ON br.prop_id = p.id
-            WHERE p.scrape_date = '2025-06-26'
-              AND br.suggested_stake IS NOT NULL
-              AND br.profit_loss IS NOT NULL
-            GROUP BY br.suggested_stake
-            ORDER BY br.suggested_stake DESC
-        ''')
-        
-        print("PERFORMANCE BY BETTING TIER:")
-        print("Stake   | Bets  | Total Staked | Total P/L | Overall ROI | Win Rate")
-        print("-" * 70)
-        
         stake_tier_names = {
             15: "$15 (odds > +750)",
             25: "$25 (odds +500 to +750)", 
@@ -292,17 +305,43 @@ def analyze_tiered_betting_performance():
             100: "$100 (odds +100 to +250 or negative odds to win $100)"
         }
         
-        for row in cursor.fetchall():
-            stake = row['suggested_stake']
-            total_bets = row['total_bets']
-            total_staked = row['total_staked']
-            total_profit_loss = row['total_profit_loss']
-            overall_roi = row['overall_roi']
-            win_rate = row['win_rate']
-            
-            tier_name = stake_tier_names.get(int(stake), f"${stake:.0f} (other)")
-            
-            print(f"${stake:3.0f}    | {total_bets:5,} | ${total_staked:10,.0f} | ${total_profit_loss:+8,.0f} | {overall_roi:+7.1f}% | {win_rate:6.1f}%")
+        # Analyze by stake amount (which corresponds to odds tiers), with the
+        # tier names joined in from a VALUES table
+        tier_values = ", ".join("(?, ?)" for _ in stake_tier_names)
+        cursor = conn.execute(f'''
+            WITH tiers(stake, name) AS (VALUES {tier_values})
+            SELECT 
+                agg.*,
+                COALESCE(t.name, printf('$%.0f (other)', agg.suggested_stake)) as tier_name
+            FROM (
+                SELECT 
+                    br.suggested_stake,
+                    COUNT(*) as total_bets,
+                    SUM(br.suggested_stake) as total_staked,
+                    SUM(br.profit_loss) as total_profit_loss,
+                    ROUND(AVG(br.roi_percentage), 1) as avg_roi,
+                    ROUND(SUM(br.profit_loss) / SUM(br.suggested_stake) * 100, 1) as overall_roi,
+                    SUM(CASE WHEN br.profit_loss > 0 THEN 1 ELSE 0 END) as winning_bets,
+                    ROUND(SUM(CASE WHEN br.profit_loss > 0 THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 1) as win_rate
+                FROM bet_results br
+                JOIN props p ON br.prop_id = p.id
+                WHERE p.scrape_date = '2025-06-26'
+                  AND br.suggested_stake IS NOT NULL
+                  AND br.profit_loss IS NOT NULL
+                GROUP BY br.suggested_stake
+            ) agg
+            LEFT JOIN tiers t ON t.stake = CAST(agg.suggested_stake AS INTEGER)
+            ORDER BY agg.suggested_stake DESC
+        ''', [value for item in stake_tier_names.items() for value in item])
+        
+        print("PERFORMANCE BY BETTING TIER:")
+        print("Stake   | Bets  | Total Staked | Total P/L | Overall ROI | Win Rate | Tier")
+        print("-" * 100)
+        
+        for row in cursor:
+            print(f"${row['suggested_stake']:3.0f}    | {row['total_bets']:5,} | ${row['total_staked']:10,.0f} | "
+                  f"${row['total_profit_loss']:+8,.0f} | {row['overall_roi']:+7.1f}% | {row['win_rate']:6.1f}%  | "
+                  f"{row['tier_name']}")
         
         print(f"\nTier Descriptions:")
         for stake, desc in stake_tier_names.items():
@@ -373,16 +412,16 @@ def create_enhanced_csv_export():
         
         filename = '/Users/doug/new_scraper/best_odds_tiered_roi_2025-06-26.csv'
         
-        with open(filename, 'w', newline='') as csvfile:
+        with open(filename, 'w', newline='', buffering=1 << 20) as csvfile:
             writer = csv.writer(csvfile)
             
             # Write header
             columns = [desc[0] for desc in cursor.description]
             writer.writerow(columns)
             
-            # Write data
-            for row in cursor.fetchall():
-                writer.writerow(row)
+            # Stream rows straight from the cursor instead of loading them all
+            cursor.arraysize = 1000
+            writer.writerows(cursor)
         
         print(f"✅ Enhanced CSV exported to: {filename}")
 
@@ -1,9 +1,45 @@
 import sqlite3
 from datetime import datetime
 
-def create_best_odds_table():
+# Connection settings for the bulk write steps: WAL journaling with NORMAL
+# sync drops the fsync on every commit, and a 64 MB page cache keeps the
+# day's props in memory while they are ranked. The box score scraper may be
+# writing at the same time, so wait up to a minute for its lock
+BULK_WRITE_PRAGMAS = """
+PRAGMA busy_timeout=60000;
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA cache_size=-65536;
+"""
+
+# One best_odds row per date, player and market; the key the populate upsert
+# resolves conflicts on
+BEST_ODDS_KEY_INDEX = 'CREATE UNIQUE INDEX IF NOT EXISTS idx_best_odds_date_player_market ON best_odds(scrape_date, player_name, market)'
+
+def ensure_props_tier_rank(cursor):
+    """Add the generated tier_rank column to props if it is missing"""
+    # Integer rank for the EV tier, A (5) down to E (1), 0 for no tier. As a
+    # virtual column it costs nothing to store and can be indexed
+    props_columns = {row[1] for row in cursor.execute('PRAGMA table_xinfo(props)')}
+    if 'tier_rank' not in props_columns:
+        cursor.execute('''
+        ALTER TABLE props ADD COLUMN tier_rank INTEGER GENERATED ALWAYS AS (
+            CASE expected_value_tier
+                WHEN 'A' THEN 5
+                WHEN 'B' THEN 4
+                WHEN 'C' THEN 3
+                WHEN 'D' THEN 2
+                WHEN 'E' THEN 1
+                ELSE 0
+            END
+        ) VIRTUAL
+        ''')
+
+def create_best_odds_table(conn=None):
     """Create a table to store only the best odds for each unique bet"""
-    conn = sqlite3.connect('mlb_props.db')
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect('mlb_props.db')
     cursor = conn.cursor()
     
     # Create the best_odds table
@@ -48,187 +84,177 @@ def create_best_odds_table():
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_best_odds_scrape_date ON best_odds(scrape_date)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_best_odds_tier ON best_odds(expected_value_tier)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_best_odds_site ON best_odds(best_site)')
+    cursor.execute(BEST_ODDS_KEY_INDEX)
+    # Only the A/B/C rows are read when populating plus_ev_bets
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_best_odds_abc ON best_odds(scrape_date, expected_value_tier) WHERE expected_value_tier IN ('A', 'B', 'C')")
+    
+    ensure_props_tier_rank(cursor)
+    
+    # Covers the per-date player+market ranking in populate_best_odds_table;
+    # id comes along implicitly as the rowid
+    cursor.execute('DROP INDEX IF EXISTS idx_props_scrape_player_market')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_props_scrape_player_market_rank ON props(scrape_date, player_name, market, tier_rank, expected_value_tier)')
     
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     print("✅ Created best_odds table with indexes")
 
-def get_numeric_value_from_tier(tier):
-    """Convert tier to numeric value for comparison (higher is better)
-    
-    CORRECTED TIER MAPPING:
-    A Tier (Highest): plus_e_5.png
-    B Tier: plus_d_4.png  
-    C Tier: plus_c_3.png
-    D Tier: plus_b_2.png
-    E Tier (Lowest): plus_a_1.png
-    """
-    tier_values = {
-        'A': 5,  # Highest
-        'B': 4,  # Second best
-        'C': 3,  # Third
-        'D': 2,  # Fourth
-        'E': 1,  # Lowest
-        '': 0,   # No tier
-        None: 0  # No tier
-    }
-    return tier_values.get(tier, 0)
-
-def populate_best_odds_table(scrape_date=None):
+def populate_best_odds_table(scrape_date=None, conn=None):
     """Populate the best_odds table with the best odds for each unique bet"""
-    conn = sqlite3.connect('mlb_props.db')
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect('mlb_props.db')
     cursor = conn.cursor()
+    cursor.executescript(BULK_WRITE_PRAGMAS)
     
     # Use today's date if no date specified
     if scrape_date is None:
         scrape_date = datetime.now().strftime('%Y-%m-%d')
     
-    # Clear existing data for this date
-    cursor.execute('DELETE FROM best_odds WHERE scrape_date = ?', (scrape_date,))
+    ensure_props_tier_rank(cursor)
+    cursor.execute(BEST_ODDS_KEY_INDEX)
+    
+    # Refresh the date's rows in one write transaction
+    cursor.execute('BEGIN IMMEDIATE')
     
-    # Get all unique player+market combinations for the date
+    # Drop only rows whose player+market no longer has any props for this
+    # date; everything else is updated in place by the upsert below
     cursor.execute('''
-    SELECT DISTINCT player_name, market 
-    FROM props 
-    WHERE DATE(scrape_date) = ?
+    DELETE FROM best_odds
+    WHERE scrape_date = ?
+      AND NOT EXISTS (
+          SELECT 1 FROM props
+          WHERE props.scrape_date = best_odds.scrape_date
+            AND props.player_name = best_odds.player_name
+            AND props.market = best_odds.market
+      )
     ''', (scrape_date,))
     
-    unique_bets = cursor.fetchall()
-    inserted_count = 0
+    # Keep the best prop for each unique player+market combination in one
+    # statement. props.tier_rank ranks A (highest, plus_e_5.png) through E
+    # (lowest, plus_a_1.png), with no tier ranked 0; ties keep the first prop
+    # in expected_value_tier, id order.
+    cursor.execute('''
+    INSERT INTO best_odds (
+        scrape_date, scrape_timestamp, game_id, date, time, home_team, away_team,
+        player_name, team, position, batting_order, market, best_site,
+        over_line, under_line, line_move, implied_projection, batx_projection,
+        implied_vs_batx_diff, suggested_bet, expected_value_raw, expected_value_tier,
+        expected_value_description, status, official_lineup, pitch_count_checked,
+        batx_pitch_count, original_prop_id
+    )
+    SELECT
+        scrape_date, scrape_timestamp, game_id, date, time, home_team, away_team,
+        player_name, team, position, batting_order, market, site,
+        over_line, under_line, line_move, implied_projection, batx_projection,
+        implied_vs_batx_diff, suggested_bet, expected_value_raw, expected_value_tier,
+        expected_value_description, status, official_lineup, pitch_count_checked,
+        batx_pitch_count, id
+    FROM (
+        SELECT id, scrape_date, scrape_timestamp, game_id, date, time, home_team, away_team,
+               player_name, team, position, batting_order, market, site,
+               over_line, under_line, line_move, implied_projection, batx_projection,
+               implied_vs_batx_diff, suggested_bet, expected_value_raw, expected_value_tier,
+               expected_value_description, status, official_lineup, pitch_count_checked,
+               batx_pitch_count,
+               ROW_NUMBER() OVER (
+                   PARTITION BY player_name, market
+                   ORDER BY tier_rank DESC, expected_value_tier ASC, id ASC
+               ) AS rn
+        FROM props
+        WHERE scrape_date = ?
+    )
+    WHERE rn = 1
+    ON CONFLICT(scrape_date, player_name, market) DO UPDATE SET
+        scrape_timestamp = excluded.scrape_timestamp,
+        game_id = excluded.game_id, date = excluded.date, time = excluded.time,
+        home_team = excluded.home_team, away_team = excluded.away_team,
+        team = excluded.team, position = excluded.position,
+        batting_order = excluded.batting_order, best_site = excluded.best_site,
+        over_line = excluded.over_line, under_line = excluded.under_line,
+        line_move = excluded.line_move,
+        implied_projection = excluded.implied_projection,
+        batx_projection = excluded.batx_projection,
+        implied_vs_batx_diff = excluded.implied_vs_batx_diff,
+        suggested_bet = excluded.suggested_bet,
+        expected_value_raw = excluded.expected_value_raw,
+        expected_value_tier = excluded.expected_value_tier,
+        expected_value_description = excluded.expected_value_description,
+        status = excluded.status, official_lineup = excluded.official_lineup,
+        pitch_count_checked = excluded.pitch_count_checked,
+        batx_pitch_count = excluded.batx_pitch_count,
+        original_prop_id = excluded.original_prop_id
+    ''', (scrape_date,))
     
-    print(f"📊 Processing {len(unique_bets)} unique player+market combinations...")
+    # One best prop is inserted or updated per unique player+market combination
+    inserted_count = cursor.rowcount
     
-    for player_name, market in unique_bets:
-        # Get all props for this player+market combination
-        cursor.execute('''
-        SELECT * FROM props 
-        WHERE DATE(scrape_date) = ? 
-        AND player_name = ? 
-        AND market = ?
-        ORDER BY expected_value_tier ASC, id ASC
-        ''', (scrape_date, player_name, market))
-        
-        all_props = cursor.fetchall()
-        
-        if not all_props:
-            continue
-            
-        # Find the best prop based on expected value tier
-        best_prop = None
-        best_tier_value = -1
-        
-        for prop in all_props:
-            # Get the column index for expected_value_tier (should be index 23)
-            tier = prop[23]  # expected_value_tier column
-            tier_value = get_numeric_value_from_tier(tier)
-            
-            if tier_value > best_tier_value:
-                best_tier_value = tier_value
-                best_prop = prop
-        
-        # If no tier found, use the first one
-        if best_prop is None:
-            best_prop = all_props[0]
-        
-        # Insert the best prop into best_odds table
-        cursor.execute('''
-        INSERT INTO best_odds (
-            scrape_date, scrape_timestamp, game_id, date, time, home_team, away_team,
-            player_name, team, position, batting_order, market, best_site,
-            over_line, under_line, line_move, implied_projection, batx_projection,
-            implied_vs_batx_diff, suggested_bet, expected_value_raw, expected_value_tier,
-            expected_value_description, status, official_lineup, pitch_count_checked,
-            batx_pitch_count, original_prop_id
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            best_prop[1],   # scrape_date
-            best_prop[2],   # scrape_timestamp
-            best_prop[4],   # game_id
-            best_prop[5],   # date
-            best_prop[6],   # time
-            best_prop[7],   # home_team
-            best_prop[8],   # away_team
-            best_prop[9],   # player_name
-            best_prop[10],  # team
-            best_prop[11],  # position
-            best_prop[12],  # batting_order
-            best_prop[14],  # market
-            best_prop[13],  # site (renamed to best_site)
-            best_prop[15],  # over_line
-            best_prop[16],  # under_line
-            best_prop[17],  # line_move
-            best_prop[18],  # implied_projection
-            best_prop[19],  # batx_projection
-            best_prop[20],  # implied_vs_batx_diff
-            best_prop[21],  # suggested_bet
-            best_prop[22],  # expected_value_raw
-            best_prop[23],  # expected_value_tier
-            best_prop[24],  # expected_value_description
-            best_prop[25],  # status
-            best_prop[26],  # official_lineup
-            best_prop[27],  # pitch_count_checked
-            best_prop[28],  # batx_pitch_count
-            best_prop[0]    # original_prop_id (original id)
-        ))
-        
-        inserted_count += 1
+    print(f"📊 Processing {inserted_count} unique player+market combinations...")
     
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     
     print(f"✅ Inserted {inserted_count} best odds entries for {scrape_date}")
     return inserted_count
 
-def analyze_best_odds(scrape_date=None):
+def analyze_best_odds(scrape_date=None, conn=None):
     """Analyze the best odds data"""
-    conn = sqlite3.connect('mlb_props.db')
+    own_conn = conn is None
+    if own_conn:
+        # Read-only reader: under WAL it runs alongside a populate on another
+        # connection, and the analysis can never write by accident
+        conn = sqlite3.connect('file:mlb_props.db?mode=ro', uri=True)
+        conn.execute('PRAGMA query_only=1')
     cursor = conn.cursor()
     
     if scrape_date is None:
         scrape_date = datetime.now().strftime('%Y-%m-%d')
     
-    # Get summary statistics
-    cursor.execute('''
-    SELECT 
-        COUNT(*) as total_best_odds,
-        COUNT(DISTINCT player_name) as unique_players,
-        COUNT(DISTINCT market) as unique_markets,
-        COUNT(DISTINCT best_site) as unique_sites
-    FROM best_odds 
-    WHERE scrape_date = ?
-    ''', (scrape_date,))
-    
-    summary = cursor.fetchone()
-    
-    # Get tier breakdown
+    # Summary, tier breakdown and site distribution in one query; the base
+    # CTE is used more than once, so SQLite reads the date's rows a single time
     cursor.execute('''
-    SELECT 
-        expected_value_tier,
-        COUNT(*) as count,
-        ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM best_odds WHERE scrape_date = ?), 2) as percentage
-    FROM best_odds 
-    WHERE scrape_date = ?
+    WITH base AS (
+        SELECT player_name, market, best_site, expected_value_tier
+        FROM best_odds
+        WHERE scrape_date = ?
+    ),
+    total AS (
+        SELECT COUNT(*) AS n FROM base
+    )
+    SELECT * FROM (
+    SELECT 'summary' AS section, NULL AS k, COUNT(*) AS count,
+           COUNT(DISTINCT player_name), COUNT(DISTINCT market), COUNT(DISTINCT best_site)
+    FROM base
+    UNION ALL
+    SELECT 'tier', expected_value_tier, COUNT(*),
+           ROUND(COUNT(*) * 100.0 / (SELECT n FROM total), 2), NULL, NULL
+    FROM base
     GROUP BY expected_value_tier
-    ORDER BY expected_value_tier
-    ''', (scrape_date, scrape_date))
-    
-    tier_breakdown = cursor.fetchall()
-    
-    # Get site distribution
-    cursor.execute('''
-    SELECT 
-        best_site,
-        COUNT(*) as count,
-        ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM best_odds WHERE scrape_date = ?), 2) as percentage
-    FROM best_odds 
-    WHERE scrape_date = ?
+    UNION ALL
+    SELECT 'site', best_site, COUNT(*),
+           ROUND(COUNT(*) * 100.0 / (SELECT n FROM total), 2), NULL, NULL
+    FROM base
     GROUP BY best_site
-    ORDER BY count DESC
-    ''', (scrape_date, scrape_date))
+    )
+    ORDER BY section, CASE WHEN section = 'site' THEN -count END, k
+    ''', (scrape_date,))
     
-    site_distribution = cursor.fetchall()
+    summary = None
+    tier_breakdown = []
+    site_distribution = []
     
-    conn.close()
+    for section, key, count, value_1, value_2, value_3 in cursor:
+        if section == 'summary':
+            summary = (count, value_1, value_2, value_3)
+        elif section == 'tier':
+            tier_breakdown.append((key, count, value_1))
+        else:
+            site_distribution.append((key, count, value_1))
+    
+    if own_conn:
+        conn.close()
     
     # Print analysis
     print(f"\n📈 BEST ODDS ANALYSIS for {scrape_date}")
@@ -248,12 +274,19 @@ def analyze_best_odds(scrape_date=None):
         print(f"  {site}: {count:,} ({percentage}%)")
 
 if __name__ == "__main__":
+    # One connection for the whole run so the PRAGMAs and page cache carry
+    # across the create, populate and analyze steps
+    conn = sqlite3.connect('mlb_props.db')
+    conn.executescript(BULK_WRITE_PRAGMAS)
+    
     # Create the table
-    create_best_odds_table()
+    create_best_odds_table(conn)
     
     # Populate with today's data
     scrape_date = datetime.now().strftime('%Y-%m-%d')
-    populate_best_odds_table(scrape_date)
+    populate_best_odds_table(scrape_date, conn)
     
     # Analyze the results
-    analyze_best_odds(scrape_date)
+    analyze_best_odds(scrape_date, conn)
+    
+    conn.close()
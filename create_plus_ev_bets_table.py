@@ -3,9 +3,16 @@
 +EV Bets Table Creation and Management
 Creates a focused table for only the highest value bets (Tier A, B, C)
 """
+import os
 import sqlite3
 import re
+import numpy as np
 from database import MLBPropsDatabase
+from create_best_odds_table import BULK_WRITE_PRAGMAS
+from calculate_tiered_betting_roi import calculate_tiered_results
+
+# American odds in parentheses, e.g. "1.5 (+150)"
+ODDS_RE = re.compile(r'\(([+-]\d+)\)')
 
 def create_plus_ev_bets_table():
     """Create the +EV Bets table for high-value tiers only"""
@@ -87,9 +94,16 @@ def populate_plus_ev_bets_from_best_odds(scrape_date='2025-06-26'):
     print("=" * 50)
     
     with sqlite3.connect('mlb_props.db') as conn:
+        conn.executescript(BULK_WRITE_PRAGMAS)
+        conn.execute("BEGIN IMMEDIATE")
+        
+        # Clear the date first so the insert below never hits a conflict;
+        # best_odds holds one row per player+market, so a plain INSERT is safe
+        conn.execute("DELETE FROM plus_ev_bets WHERE scrape_date = ?", (scrape_date,))
+        
         # Insert A, B, C tier bets from best_odds into plus_ev_bets
         cursor = conn.execute("""
-            INSERT OR REPLACE INTO plus_ev_bets (
+            INSERT INTO plus_ev_bets (
                 scrape_date, scrape_timestamp, game_id, date, time, home_team, away_team,
                 player_name, team, position, batting_order, market, best_site,
                 over_line, under_line, line_move, implied_projection, batx_projection,
@@ -123,8 +137,8 @@ def populate_plus_ev_bets_from_best_odds(scrape_date='2025-06-26'):
             SELECT 
                 expected_value_tier,
                 COUNT(*) as count,
-                COUNT(CASE WHEN suggested_bet = 'OVER' THEN 1 END) as over_bets,
-                COUNT(CASE WHEN suggested_bet = 'UNDER' THEN 1 END) as under_bets
+                COUNT(*) FILTER (WHERE suggested_bet = 'OVER') as over_bets,
+                COUNT(*) FILTER (WHERE suggested_bet = 'UNDER') as under_bets
             FROM plus_ev_bets
             WHERE scrape_date = ?
             GROUP BY expected_value_tier
@@ -149,7 +163,7 @@ def calculate_plus_ev_roi(scrape_date='2025-06-26'):
         """Parse American odds string to numeric value"""
         if not odds_string or odds_string.strip() == '':
             return None
-        match = re.search(r'\(([+-]\d+)\)', odds_string)
+        match = ODDS_RE.search(odds_string)
         if match:
             try:
                 return int(match.group(1))
@@ -157,40 +171,6 @@ def calculate_plus_ev_roi(scrape_date='2025-06-26'):
                 return None
         return None
 
-    def calculate_suggested_stake_tiered(odds_value):
-        """Calculate suggested stake based on tiered odds ranges"""
-        if odds_value is None:
-            return None
-        
-        if odds_value > 0:
-            if 100 <= odds_value <= 250:
-                return 100.0
-            elif 250 < odds_value <= 500:
-                return 50.0
-            elif 500 < odds_value <= 750:
-                return 25.0
-            elif odds_value > 750:
-                return 15.0
-            else:
-                return 100.0
-        elif odds_value < 0:
-            return abs(odds_value)
-        else:
-            return None
-
-    def calculate_profit_loss(odds_value, stake, bet_won):
-        """Calculate profit or loss for a bet"""
-        if odds_value is None or stake is None or bet_won is None:
-            return None
-        
-        if bet_won:
-            if odds_value > 0:
-                return (odds_value / 100) * stake
-            else:
-                return (100 / abs(odds_value)) * stake
-        else:
-            return -stake
-
     db = MLBPropsDatabase()
     updated_count = 0
     
@@ -221,54 +201,45 @@ def calculate_plus_ev_roi(scrape_date='2025-06-26'):
         except sqlite3.OperationalError:
             print("ℹ️  ROI columns already exist in plus_ev_bets table")
         
-        resolved_count = 0
-        unresolved_count = 0
+        # Only bets with a result on their suggested side can be priced
+        resolved = np.array([bet[6] is not None for bet in plus_ev_bets], dtype=bool)
+        suggested = np.array([bet[1] for bet in plus_ev_bets], dtype=object)
+        is_over = suggested == 'OVER'
+        is_under = suggested == 'UNDER'
+        unresolved_count = int((~resolved).sum())
         
-        for bet in plus_ev_bets:
-            pev_id, suggested_bet, over_line, under_line, over_result, under_result, bet_result_id = bet
-            
-            if bet_result_id is None:
-                # No bet result found
-                unresolved_count += 1
-                continue
-            
-            # Determine bet result and odds
-            if suggested_bet == 'OVER':
-                odds_string = over_line
-                bet_won = (over_result == 'win')
-                bet_result = 'WIN' if over_result == 'win' else 'LOSS' if over_result == 'loss' else 'PUSH'
-            elif suggested_bet == 'UNDER':
-                odds_string = under_line
-                bet_won = (under_result == 'win')
-                bet_result = 'WIN' if under_result == 'win' else 'LOSS' if under_result == 'loss' else 'PUSH'
-            else:
-                continue
-            
-            # Calculate ROI
-            odds_value = parse_odds(odds_string)
-            if odds_value is None:
-                continue
-            
-            suggested_stake = calculate_suggested_stake_tiered(odds_value)
-            if suggested_stake is None:
-                continue
-            
-            profit_loss = calculate_profit_loss(odds_value, suggested_stake, bet_won)
-            if profit_loss is None:
+        odds_strings = np.where(is_over,
+                                np.array([bet[2] for bet in plus_ev_bets], dtype=object),
+                                np.array([bet[3] for bet in plus_ev_bets], dtype=object))
+        results = np.where(is_over,
+                           np.array([bet[4] for bet in plus_ev_bets], dtype=object),
+                           np.array([bet[5] for bet in plus_ev_bets], dtype=object))
+        bet_results = np.where(results == 'win', 'WIN', np.where(results == 'loss', 'LOSS', 'PUSH'))
+        
+        # Parse the odds of each priceable bet, then compute stake, P/L and
+        # ROI for all of them in one vectorized pass
+        positions = []
+        odds_values = []
+        
+        for i in np.flatnonzero(resolved & (is_over | is_under)).tolist():
+            odds_value = parse_odds(odds_strings[i])
+            if not odds_value:
                 continue
-            
-            roi_percentage = (profit_loss / suggested_stake) * 100
-            
-            # Update plus_ev_bets record
-            conn.execute("""
-                UPDATE plus_ev_bets 
-                SET suggested_stake = ?, profit_loss = ?, roi_percentage = ?, bet_result = ?
-                WHERE id = ?
-            """, (suggested_stake, profit_loss, roi_percentage, bet_result, pev_id))
-            
-            resolved_count += 1
-            updated_count += 1
+            positions.append(i)
+            odds_values.append(odds_value)
+        
+        stakes, profits, rois = calculate_tiered_results(odds_values, results[positions] == 'win')
+        updates = list(zip(stakes.tolist(), profits.tolist(), rois.tolist(),
+                           bet_results[positions].tolist(),
+                           [plus_ev_bets[i][0] for i in positions]))
+        resolved_count = updated_count = len(updates)
         
+        # Apply every update in one batch and commit once
+        conn.executemany("""
+            UPDATE plus_ev_bets 
+            SET suggested_stake = ?, profit_loss = ?, roi_percentage = ?, bet_result = ?
+            WHERE id = ?
+        """, updates)
         conn.commit()
         
         print(f"✅ Updated {updated_count} +EV bets with ROI data")
@@ -288,14 +259,14 @@ def analyze_plus_ev_performance(scrape_date='2025-06-26'):
         cursor = conn.execute("""
             SELECT 
                 COUNT(*) as total_bets,
-                COUNT(CASE WHEN bet_result IS NOT NULL THEN 1 END) as resolved_bets,
+                COUNT(*) FILTER (WHERE bet_result IS NOT NULL) as resolved_bets,
                 SUM(suggested_stake) as total_staked,
                 SUM(profit_loss) as total_profit_loss,
                 ROUND(SUM(profit_loss) / SUM(suggested_stake) * 100, 1) as overall_roi,
-                COUNT(CASE WHEN bet_result = 'WIN' THEN 1 END) as wins,
-                COUNT(CASE WHEN bet_result = 'LOSS' THEN 1 END) as losses,
-                ROUND(COUNT(CASE WHEN bet_result = 'WIN' THEN 1 END) * 100.0 / 
-                      COUNT(CASE WHEN bet_result IS NOT NULL THEN 1 END), 1) as win_rate
+                COUNT(*) FILTER (WHERE bet_result = 'WIN') as wins,
+                COUNT(*) FILTER (WHERE bet_result = 'LOSS') as losses,
+                ROUND(COUNT(*) FILTER (WHERE bet_result = 'WIN') * 100.0 / 
+                      COUNT(*) FILTER (WHERE bet_result IS NOT NULL), 1) as win_rate
             FROM plus_ev_bets
             WHERE scrape_date = ?
               AND suggested_stake IS NOT NULL
@@ -319,10 +290,10 @@ def analyze_plus_ev_performance(scrape_date='2025-06-26'):
                 SUM(suggested_stake) as total_staked,
                 SUM(profit_loss) as total_profit_loss,
                 ROUND(SUM(profit_loss) / SUM(suggested_stake) * 100, 1) as overall_roi,
-                COUNT(CASE WHEN bet_result = 'WIN' THEN 1 END) as wins,
-                COUNT(CASE WHEN bet_result = 'LOSS' THEN 1 END) as losses,
-                ROUND(COUNT(CASE WHEN bet_result = 'WIN' THEN 1 END) * 100.0 / 
-                      COUNT(CASE WHEN bet_result IS NOT NULL THEN 1 END), 1) as win_rate,
+                COUNT(*) FILTER (WHERE bet_result = 'WIN') as wins,
+                COUNT(*) FILTER (WHERE bet_result = 'LOSS') as losses,
+                ROUND(COUNT(*) FILTER (WHERE bet_result = 'WIN') * 100.0 / 
+                      COUNT(*) FILTER (WHERE bet_result IS NOT NULL), 1) as win_rate,
                 MAX(profit_loss) as best_win,
                 MIN(profit_loss) as worst_loss
             FROM plus_ev_bets
@@ -372,18 +343,22 @@ def create_plus_ev_csv_export(scrape_date='2025-06-26'):
         """, (scrape_date,))
         
         import csv
-        filename = f'/Users/doug/new_scraper/plus_ev_bets_{scrape_date}.csv'
+        export_dir = os.environ.get('MLB_EXPORT_DIR', '.')
+        filename = os.path.join(export_dir, f'plus_ev_bets_{scrape_date}.csv')
+        tmp_filename = filename + '.tmp'
         
-        with open(filename, 'w', newline='') as csvfile:
+        # Write to a temp file and swap it in so readers never see a partial CSV
+        with open(tmp_filename, 'w', newline='', buffering=1 << 20) as csvfile:
             writer = csv.writer(csvfile)
             
             # Write header
-            columns = [desc[0] for desc in cursor.description]
-            writer.writerow(columns)
+            writer.writerow([desc[0] for desc in cursor.description])
             
-            # Write data
-            for row in cursor.fetchall():
-                writer.writerow(row)
+            # Stream rows straight from the cursor instead of loading them all
+            cursor.arraysize = 1000
+            writer.writerows(cursor)
+        
+        os.replace(tmp_filename, filename)
         
         print(f"✅ +EV Bets CSV exported to: {filename}")
 
@@ -5,76 +5,220 @@ Runs the complete workflow every morning at 9am
 """
 import os
 import sys
+import asyncio
+import shlex
+import shutil
+import signal
 import subprocess
 import logging
+import logging.handlers
 from datetime import datetime, date
 import time
 
+WORKING_DIR = "/Users/doug/06-27 Full Working MLB Prop System"
+
+# Longest single output line read from a workflow step (asyncio's default is 64 KB)
+STREAM_LINE_LIMIT = 1 << 20
+
+# Log records held in memory before the log file is written
+LOG_BUFFER_CAPACITY = 1024
+
+# Days of rotated log files kept next to the current one
+LOG_BACKUP_DAYS = 90
+
 # Setup logging
 def setup_logging():
     """Setup logging for the daily automation"""
-    log_dir = "/Users/doug/06-27 Full Working MLB Prop System/logs"
+    log_dir = os.path.join(WORKING_DIR, "logs")
     os.makedirs(log_dir, exist_ok=True)
     
-    log_file = os.path.join(log_dir, f"daily_automation_{date.today().strftime('%Y-%m-%d')}.log")
+    # Rolls over at midnight, so a run that crosses into the next day keeps
+    # one open file; earlier days are kept as daily_automation.log.YYYY-MM-DD
+    log_file = os.path.join(log_dir, "daily_automation.log")
+    
+    log_format = '%(asctime)s - %(levelname)s - %(message)s'
+    
+    # The log file is written in batches of LOG_BUFFER_CAPACITY records (or
+    # straight away on an error) instead of one write per line; the console
+    # handler stays live. The buffering handler replays records through the
+    # file handler, so that one needs its own formatter
+    file_handler = logging.handlers.TimedRotatingFileHandler(
+        log_file,
+        when='midnight',
+        backupCount=LOG_BACKUP_DAYS,
+        delay=True
+    )
+    file_handler.setFormatter(logging.Formatter(log_format))
+    buffered_file_handler = logging.handlers.MemoryHandler(
+        capacity=LOG_BUFFER_CAPACITY,
+        flushLevel=logging.ERROR,
+        target=file_handler
+    )
     
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
+        format=log_format,
         handlers=[
-            logging.FileHandler(log_file),
+            buffered_file_handler,
             logging.StreamHandler(sys.stdout)
         ]
     )
     
+    # logging.shutdown() flushes the buffer at exit; turn SIGTERM into a
+    # normal exit so a killed workflow still gets there
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    
     return logging.getLogger(__name__)
 
-def run_command(command, description, logger, timeout=3600):
-    """Run a command with logging and error handling"""
+def _exit_on_sigterm(signum, frame):
+    sys.exit(128 + signum)
+
+async def _drain(stream, log, prefix):
+    """Log each line of a child process stream as it arrives"""
+    async for line in stream:
+        log(f"{prefix}{line.decode(errors='replace').rstrip()}")
+
+async def run_command_async(command, description, logger, timeout=3600):
+    """Run a command with logging and error handling, streaming its output"""
     logger.info(f"🔄 Starting: {description}")
     logger.info(f"Command: {command}")
     
     try:
         start_time = time.time()
-        result = subprocess.run(
-            command, 
-            shell=True, 
-            capture_output=True, 
-            text=True, 
-            timeout=timeout,
-            cwd="/Users/doug/06-27 Full Working MLB Prop System"
+        process = await asyncio.create_subprocess_exec(
+            *shlex.split(command),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=WORKING_DIR,
+            limit=STREAM_LINE_LIMIT
+        )
+        
+        output = asyncio.gather(
+            _drain(process.stdout, logger.info, f"[{description}] "),
+            _drain(process.stderr, logger.warning, f"[{description}] "),
+            process.wait()
         )
         
+        try:
+            await asyncio.wait_for(output, timeout=timeout)
+        except asyncio.TimeoutError:
+            # Don't leave the child running after we give up on it
+            process.kill()
+            await process.wait()
+            logger.error(f"⏰ Timeout: {description} (exceeded {timeout}s)")
+            return False
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            await asyncio.gather(output, return_exceptions=True)
+            logger.warning(f"🛑 Cancelled: {description}")
+            raise
+        except Exception:
+            # A stream reader failed (e.g. a line over STREAM_LINE_LIMIT);
+            # stop the child before reporting it below
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
+            raise
+
         end_time = time.time()
         duration = end_time - start_time
         
-        if result.returncode == 0:
+        if process.returncode == 0:
             logger.info(f"✅ Completed: {description} (took {duration:.1f}s)")
-            if result.stdout:
-                logger.info(f"Output: {result.stdout.strip()}")
             return True
         else:
             logger.error(f"❌ Failed: {description}")
-            logger.error(f"Exit code: {result.returncode}")
-            logger.error(f"Error: {result.stderr}")
+            logger.error(f"Exit code: {process.returncode}")
             return False
             
-    except subprocess.TimeoutExpired:
-        logger.error(f"⏰ Timeout: {description} (exceeded {timeout}s)")
-        return False
     except Exception as e:
         logger.error(f"💥 Exception in {description}: {e}")
         return False
 
+def _applescript_escape(text):
+    """Escape text for use inside an AppleScript string literal"""
+    return str(text).replace('\\', '\\\\').replace('"', '\\"')
+
+def _has_gui_session():
+    """Whether osascript can reach a logged-in desktop for this user"""
+    if sys.platform != 'darwin' or shutil.which('osascript') is None:
+        return False
+    try:
+        # The console is owned by whoever is logged in at the desktop; under
+        # launchd/cron with nobody logged in the notification has nowhere to go
+        return os.stat('/dev/console').st_uid == os.getuid()
+    except OSError:
+        return False
+
+# Checked once per run rather than forking osascript to find out
+HAS_GUI_SESSION = _has_gui_session()
+
 def send_notification(title, message, logger):
     """Send macOS notification"""
+    if not HAS_GUI_SESSION:
+        logger.info(f"📱 Notification skipped (no desktop session): {title}")
+        return
+    
     try:
-        cmd = f'osascript -e \'display notification "{message}" with title "{title}"\''
-        subprocess.run(cmd, shell=True, capture_output=True)
+        script = f'display notification "{_applescript_escape(message)}" with title "{_applescript_escape(title)}"'
+        subprocess.run(["osascript", "-e", script], capture_output=True)
         logger.info(f"📱 Notification sent: {title}")
     except Exception as e:
         logger.warning(f"Failed to send notification: {e}")
 
+async def run_workflow_steps(workflow_steps, logger):
+    """Run each workflow step once the steps it depends on have finished
+    Returns (success_count, failed_steps). A failed non-critical step does not
+    hold back its dependents; a failed critical step cancels everything else.
+    """
+    tasks = {}
+    steps_by_task = {}
+    
+    async def run_step(step):
+        await asyncio.gather(*(tasks[name] for name in step.get("depends_on", [])))
+        return await run_command_async(
+            step["command"], 
+            step["description"], 
+            logger, 
+            step["timeout"]
+        )
+    
+    for step in workflow_steps:
+        task = asyncio.create_task(run_step(step))
+        tasks[step["name"]] = task
+        steps_by_task[task] = step
+    
+    success_count = 0
+    failed_steps = []
+    pending = set(tasks.values())
+    
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        
+        for task in done:
+            step = steps_by_task[task]
+            if task.cancelled():
+                continue
+            
+            if task.result():
+                success_count += 1
+            else:
+                failed_steps.append(step["description"])
+                if step["critical"]:
+                    logger.error(f"💀 Critical step failed: {step['description']}")
+                    logger.error("🛑 Stopping workflow due to critical failure")
+                    for other in pending:
+                        other.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+                    pending = set()
+                    break
+                else:
+                    logger.warning(f"⚠️  Non-critical step failed: {step['description']}")
+                    logger.info("▶️  Continuing with remaining steps...")
+    
+    return success_count, failed_steps
+
 def daily_workflow():
     """Run the complete daily MLB props workflow"""
     
@@ -85,7 +229,7 @@ def daily_workflow():
     logger.info("=" * 60)
     logger.info(f"Date: {current_date}")
     logger.info(f"Time: {datetime.now().strftime('%H:%M:%S')}")
-    logger.info(f"Working Directory: /Users/doug/06-27 Full Working MLB Prop System")
+    logger.info(f"Working Directory: {WORKING_DIR}")
     
     # Send start notification
     send_notification(
@@ -96,60 +240,49 @@ def daily_workflow():
     
     workflow_steps = [
         {
+            "name": "morning_workflow",
             "command": "python3 morning_workflow.py",
             "description": "2. Create Best Props & Odds",
             "timeout": 7200,   # 2 Hours
-            "critical": True
+            "critical": True,
+            "depends_on": []
         },
         {
+            "name": "plus_ev_bets",
             "command": "python3 update_plus_ev_workflow.py",
             "description": "3. Create +EV Bets Table",
             "timeout": 300,   # 5 minutes
-            "critical": True
+            "critical": True,
+            "depends_on": ["morning_workflow"]
         },
         {
+            "name": "box_scores",
             "command": "python3 box_score_scraper.py",
             "description": "4. Collect Box Scores",
             "timeout": 1800,  # 30 minutes
-            "critical": False  # Can fail if games not completed yet
+            "critical": False,  # Can fail if games not completed yet
+            "depends_on": []    # Yesterday's games; runs alongside the props scrape
         },
         {
+            "name": "resolve_bets",
             "command": "python3 enhanced_bet_resolver.py",
             "description": "5. Resolve Bets",
             "timeout": 600,   # 10 minutes
-            "critical": False  # Can fail if no box scores available
+            "critical": False,  # Can fail if no box scores available
+            "depends_on": ["plus_ev_bets", "box_scores"]
         },
         {
+            "name": "roi",
             "command": "python3 calculate_tiered_betting_roi.py",
             "description": "6. Calculate ROI & Generate Reports",
             "timeout": 300,   # 5 minutes
-            "critical": False  # Can fail if no resolved bets
+            "critical": False,  # Can fail if no resolved bets
+            "depends_on": ["resolve_bets"]
         }
     ]
     
-    success_count = 0
     total_steps = len(workflow_steps)
-    failed_steps = []
-    
-    for step in workflow_steps:
-        success = run_command(
-            step["command"], 
-            step["description"], 
-            logger, 
-            step["timeout"]
-        )
-        
-        if success:
-            success_count += 1
-        else:
-            failed_steps.append(step["description"])
-            if step["critical"]:
-                logger.error(f"💀 Critical step failed: {step['description']}")
-                logger.error("🛑 Stopping workflow due to critical failure")
-                break
-            else:
-                logger.warning(f"⚠️  Non-critical step failed: {step['description']}")
-                logger.info("▶️  Continuing with remaining steps...")
+    success_count, failed_steps = asyncio.run(run_workflow_steps(workflow_steps, logger))
     
     # Final summary
     logger.info("📊 DAILY WORKFLOW SUMMARY")
@@ -180,7 +313,7 @@ def daily_workflow():
     )
     
     logger.info(f"🏁 Daily automation completed at {datetime.now().strftime('%H:%M:%S')}")
-    logger.info(f"📁 Full log saved to: logs/daily_automation_{current_date}.log")
+    logger.info("📁 Full log saved to: logs/daily_automation.log")
     
     return success_count == total_steps
 
@@ -4,29 +4,66 @@ Daily MLB Props Scraper
 Main script for daily data collection and bet result resolution
 """
 import logging
+import logging.handlers
 import json
+import signal
+from collections import Counter
 from datetime import datetime, date, timedelta
-from typing import Dict, List, Any
+from itertools import count, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Any
 from enhanced_ev_calculator import EnhancedEVCalculator
 import sys
 import os
 
 # Import our modules
 from database import MLBPropsDatabase
-from working_scraper import parse_expected_value
+from working_scraper import iter_scraped_rows, parse_expected_value, scrape_basic
 from result_scraper import MLBResultScraper
 
-# Set up logging
+try:
+    # orjson serializes the summary in C and hands back bytes ready to write
+    import orjson
+
+    def _dumps_summary(summary: Dict) -> bytes:
+        return orjson.dumps(summary, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _dumps_summary(summary: Dict) -> bytes:
+        return json.dumps(summary, indent=2).encode()
+
+# Days of rotated log files kept next to the current one
+LOG_BACKUP_DAYS = 90
+
+# Set up logging; file records are written out 1024 at a time, or at once
+# for errors, and the rest at exit. The file rolls over at midnight, keeping
+# LOG_BACKUP_DAYS days as mlb_scraper.log.YYYY-MM-DD
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_log_file_handler = logging.handlers.TimedRotatingFileHandler(
+    'mlb_scraper.log', when='midnight', backupCount=LOG_BACKUP_DAYS, delay=True
+)
+_log_file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler(f'mlb_scraper_{date.today().isoformat()}.log'),
+        logging.handlers.MemoryHandler(capacity=1024, flushLevel=logging.ERROR, target=_log_file_handler),
         logging.StreamHandler(sys.stdout)
     ]
 )
 logger = logging.getLogger(__name__)
 
+# Scraped props are processed and written to the database this many at a time
+PROPS_INSERT_CHUNK_SIZE = 500
+
+# cleanup_old_data vacuums once at least this share of the database file is free pages
+VACUUM_FREE_PAGE_RATIO = 0.25
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of up to size items from iterable"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
 
 class DailyMLBScraper:
     """Main daily scraper orchestrator"""
@@ -83,54 +120,76 @@ class DailyMLBScraper:
             # Remove the 2-page limit for production
             scraper.remove_page_limit()
             
-            # Run the scraper
-            raw_data = scraper.scrape_all_data()
+            # Stream rows from the scraper through processing into the
+            # database in chunks, so only one chunk is held in memory at a
+            # time. zip() only advances raw_counter after a row was read, so
+            # it ends up holding the number of scraped rows
+            raw_counter = count()
+            raw_data = (row for row, _ in zip(scraper.iter_all_data(), raw_counter))
             
-            if not raw_data:
-                logger.warning("No data scraped")
-                return {'total_records': 0, 'pages_processed': 0, 'tier_breakdown': {}}
+            records_inserted = 0
+            tier_counts = Counter()
             
-            # Process and enhance the data
-            processed_data = self.process_scraped_data(raw_data)
+            processed_data = self.process_scraped_data(raw_data, tier_counts)
+            for chunk in _chunked(processed_data, PROPS_INSERT_CHUNK_SIZE):
+                records_inserted += self.db.insert_props_data(chunk, session_id)
             
-            # Insert into database
-            records_inserted = self.db.insert_props_data(processed_data, session_id)
+            # The whole scrape can leave the planner statistics well behind
+            # the tables; refresh them once it is all in
+            if records_inserted:
+                self.db.optimize()
             
-            # Calculate tier breakdown
-            tier_breakdown = self.calculate_tier_breakdown(processed_data)
+            raw_data_count = next(raw_counter)
+            
+            if not raw_data_count:
+                logger.warning("No data scraped")
+                return {'total_records': 0, 'pages_processed': 0, 'tier_breakdown': {}}
             
             logger.info(f"Props scraping completed: {records_inserted} records inserted")
             
             return {
                 'total_records': records_inserted,
-                'pages_processed': len(raw_data) // 250 + 1,
-                'tier_breakdown': tier_breakdown,
-                'raw_data_count': len(raw_data)
+                'pages_processed': raw_data_count // 250 + 1,
+                'tier_breakdown': self.summarize_tier_counts(tier_counts),
+                'raw_data_count': raw_data_count
             }
             
         except Exception as e:
             logger.error(f"Props scraping failed: {e}")
             raise
     
-    def process_scraped_data(self, raw_data: List[Dict]) -> List[Dict]:
-        """Process and enhance scraped data"""
+    def process_scraped_data(self, raw_data: Iterable[Dict],
+                             tier_counts: Optional[Counter] = None) -> Iterator[Dict]:
+        """Process and enhance scraped data, yielding records as they are ready
+        
+        If tier_counts is given, it is updated with the parsed EV tier of each
+        record yielded.
+        """
         ev_calculator = EnhancedEVCalculator()
-        processed_data = []
+        
+        # One timestamp for the whole batch
+        processing_timestamp = datetime.now().isoformat()
+        
+        # Bound once rather than looked up for every record
+        extract_line_value = ev_calculator.extract_line_value
+        calculate_prop_ev = ev_calculator.calculate_prop_ev
         
         for record in raw_data:
             try:
-                # Extract projections and odds
-                batx_projection = record.get('batx_projection', None)
-                implied_projection = record.get('implied_projection', None)
-                over_line = record.get('over_line')
-                under_line = record.get('under_line')
-                suggested_bet = record.get('suggested_bet', '')
+                # Extract projections and odds; records may be missing any
+                # of these fields, so read them through .get
+                get = record.get
+                batx_projection = get('batx_projection')
+                implied_projection = get('implied_projection')
+                over_line = get('over_line')
+                under_line = get('under_line')
+                suggested_bet = get('suggested_bet', '')
                 
                 if batx_projection and implied_projection and (over_line or under_line):
-                    line_value = ev_calculator.extract_line_value(over_line if suggested_bet.upper() == 'OVER' else under_line)
+                    line_value = extract_line_value(over_line if suggested_bet.upper() == 'OVER' else under_line)
                     
                     # Calculate enhanced EV
-                    ev_result = ev_calculator.calculate_prop_ev(
+                    ev_result = calculate_prop_ev(
                         batx_projection=batx_projection,
                         implied_projection=implied_projection,
                         line_value=line_value,
@@ -148,34 +207,25 @@ class DailyMLBScraper:
                     record['ev_description'] = 'Insufficient Data'
 
                 # Add processing timestamp
-                record['processing_timestamp'] = datetime.now().isoformat()
-                
-                processed_data.append(record)
+                record['processing_timestamp'] = processing_timestamp
                 
             except Exception as e:
                 logger.warning(f"Error processing record: {e}")
                 continue
-        
-        return processed_data
+            
+            if tier_counts is not None:
+                tier_counts[record['ev_tier_parsed']] += 1
+            
+            yield record
     
-    def calculate_tier_breakdown(self, data: List[Dict]) -> Dict[str, int]:
-        """Calculate Expected Value tier breakdown"""
-        tier_counts = {'A': 0, 'B': 0, 'C': 0, 'D': 0, 'None': 0}
+    def summarize_tier_counts(self, tier_counts: Counter) -> Dict[str, int]:
+        """Build the Expected Value tier breakdown from per-tier record counts"""
+        breakdown = {tier: tier_counts[tier] for tier in ('A', 'B', 'C', 'D')}
         
-        for record in data:
-            ev_tier = record.get('ev_tier_parsed')
-            if ev_tier == 'A':
-                tier_counts['A'] += 1
-            elif ev_tier == 'B':
-                tier_counts['B'] += 1
-            elif ev_tier == 'C':
-                tier_counts['C'] += 1
-            elif ev_tier == 'D':
-                tier_counts['D'] += 1
-            else:
-                tier_counts['None'] += 1
+        # E, Unknown and missing tiers all fall under 'None'
+        breakdown['None'] = sum(tier_counts.values()) - sum(breakdown.values())
         
-        return tier_counts
+        return breakdown
     
     def resolve_previous_bets(self, previous_date: date) -> Dict[str, Any]:
         """Resolve bets from previous day"""
@@ -239,13 +289,12 @@ class DailyMLBScraper:
     
     def get_top_tier_a_bets(self, scrape_date: date, limit: int = 10) -> List[Dict]:
         """Get top Tier A bets for the day"""
-        tier_a_bets = self.db.get_props_by_tier(scrape_date, 'A')
-        
         # Sort by suggested bet confidence or other criteria
-        # For now, just return first 10
-        top_bets = []
-        for bet in tier_a_bets[:limit]:
-            top_bets.append({
+        # For now, just return the first ones; the database applies the limit
+        tier_a_bets = self.db.get_props_by_tier(scrape_date, 'A', limit=limit)
+        
+        return [
+            {
                 'player_name': bet['player_name'],
                 'team': bet['team'],
                 'market': bet['market'],
@@ -255,17 +304,21 @@ class DailyMLBScraper:
                 'implied_projection': bet['implied_projection'],
                 'batx_projection': bet['batx_projection'],
                 'game': f"{bet['away_team']}@{bet['home_team']}"
-            })
-        
-        return top_bets
+            }
+            for bet in tier_a_bets
+        ]
     
     def save_daily_summary(self, summary: Dict):
         """Save daily summary to JSON file"""
         filename = f"daily_summary_{summary['scrape_date']}.json"
         
         try:
-            with open(filename, 'w') as f:
-                json.dump(summary, f, indent=2)
+            # Write the whole file at once to a temp name, then swap it in so
+            # a killed run never leaves a truncated summary behind
+            tmp_filename = filename + '.tmp'
+            with open(tmp_filename, 'wb') as f:
+                f.write(_dumps_summary(summary))
+            os.replace(tmp_filename, filename)
             logger.info(f"Daily summary saved to {filename}")
             
         except Exception as e:
@@ -279,6 +332,9 @@ class DailyMLBScraper:
         
         try:
             with self.db.get_connection() as conn:
+                # Both deletes commit together when the block exits
+                conn.execute("BEGIN IMMEDIATE")
+                
                 # Clean up old props data
                 conn.execute("""
                     DELETE FROM props WHERE scrape_date < ?
@@ -290,7 +346,17 @@ class DailyMLBScraper:
                 """, (cutoff_date,))
                 
                 # Keep bet results (they're valuable for analysis)
-                logger.info("Data cleanup completed")
+            
+            # Deleted rows leave free pages in the file; only rebuild it once
+            # enough has piled up rather than on every cleanup
+            with self.db.get_connection() as conn:
+                page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+                free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if page_count and free_pages / page_count >= VACUUM_FREE_PAGE_RATIO:
+                    logger.info(f"Vacuuming database ({free_pages}/{page_count} pages free)")
+                    conn.execute("VACUUM")
+            
+            logger.info("Data cleanup completed")
                 
         except Exception as e:
             logger.error(f"Data cleanup failed: {e}")
@@ -299,10 +365,6 @@ class DailyMLBScraper:
 class SimplifiedMLBScraper:
     """Simplified scraper interface for daily use"""
     
-    def __init__(self):
-        from working_scraper import scrape_basic, init_browser, login_simple
-        self.scrape_basic = scrape_basic
-        
     def remove_page_limit(self):
         """Remove the 2-page limit for production runs"""
         # This would modify the scraper to run without page limits
@@ -310,9 +372,11 @@ class SimplifiedMLBScraper:
     
     def scrape_all_data(self) -> List[Dict]:
         """Scrape all available data"""
-        # Import and run the working scraper
-        from working_scraper import scrape_basic
         return scrape_basic()
+    
+    def iter_all_data(self) -> Iterator[Dict]:
+        """Scrape all available data, yielding rows as they are read"""
+        return iter_scraped_rows()
 
 
 def main():
@@ -328,6 +392,9 @@ def main():
     
     args = parser.parse_args()
     
+    # Exit normally on SIGTERM so the buffered log file is flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    
     # Parse date
     if args.date:
         scrape_date = datetime.strptime(args.date, '%Y-%m-%d').date()
@@ -388,6 +455,8 @@ def main():
     except Exception as e:
         logger.error(f"Scraper failed: {e}")
         sys.exit(1)
+    finally:
+        scraper.db.close()
 
 
 if __name__ == "__main__":
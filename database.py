@@ -8,9 +8,32 @@ import json
 import logging
 import re
 from datetime import datetime, date
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 import os
 from contextlib import contextmanager
+from functools import lru_cache
+import weakref
+
+# Applied once to the shared connection: NORMAL sync is safe under WAL and
+# skips the fsync on every commit, with a 64 MB page cache, in-memory temp
+# tables for the sorts and joins, and reads served from a memory map of the
+# file (up to 2 GB) instead of read() calls. analysis_limit keeps each
+# ANALYZE run by PRAGMA optimize to a sample of rows per index. The morning
+# workflow and the box score scraper write to the database at the same time,
+# so a write waits up to a minute for the other's transaction instead of
+# failing after sqlite3's default 5 s
+CONNECTION_PRAGMAS = """
+PRAGMA busy_timeout=60000;
+PRAGMA synchronous=NORMAL;
+PRAGMA cache_size=-65536;
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=2147483648;
+PRAGMA analysis_limit=400;
+"""
+
+# Compiled statements kept by the shared connection. Every method's SQL plus
+# the variable-length IN (...) lookups stay prepared for the whole run
+STATEMENT_CACHE_SIZE = 256
 
 # Mapping of alternate team abbreviations to a single
 # normalized three-letter form. This keeps team values
@@ -52,23 +75,133 @@ TEAM_ABBR_NORMALIZATION = {
 logger = logging.getLogger(__name__)
 
 
+def _normalize_team_abbreviation(abbr: str) -> str:
+    """Return normalized 3-letter team abbreviation"""
+    if not abbr:
+        return ""
+    abbr = abbr.upper().strip()
+    return TEAM_ABBR_NORMALIZATION.get(abbr, abbr)
+
+
+# Expected value image names (plus_e_5.png ... plus_a_1.png) mapped to
+# (tier, description); plus_e is the best tier
+EV_IMAGE_RE = re.compile(r'plus_([a-e])')
+EV_IMAGE_TIERS = {
+    'e': ('A', 'Excellent Expected Value'),
+    'd': ('B', 'Very Good Expected Value'),
+    'c': ('C', 'Good Expected Value'),
+    'b': ('D', 'Fair Expected Value'),
+    'a': ('E', 'Lower Expected Value'),
+}
+
+# First number in a line string like "o1.5 (-110)"
+LINE_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+# American odds, either in parentheses after the line or on their own
+ODDS_PAREN_RE = re.compile(r"\(([+-]\d+)\)")
+ODDS_BARE_RE = re.compile(r"^([+-]\d+)$")
+
+
+def _parse_odds(odds_string: Optional[str]) -> Optional[int]:
+    """Parse American odds from a line string like "1.5 (-110)" or "+120"
+
+    Registered on the shared connection as the SQL function parse_odds
+    """
+    if not odds_string or odds_string.strip() == "":
+        return None
+    match = ODDS_PAREN_RE.search(odds_string) or ODDS_BARE_RE.search(odds_string.strip())
+    return int(match.group(1)) if match else None
+
+# The game and expected value strings repeat across nearly every prop of a
+# scrape (a dozen or so games, one image per tier), so each distinct value is
+# parsed once and the results are returned as immutable tuples
+
+@lru_cache(maxsize=256)
+def _parse_game_info(game_str: str) -> Tuple[str, str, str]:
+    """Parse game string like 'LAD@COL' into (game_id, away_team, home_team)"""
+    if '@' in game_str:
+        parts = game_str.split('@')
+        away_team = _normalize_team_abbreviation(parts[0].strip())
+        home_team = _normalize_team_abbreviation(parts[1].strip())
+        game_id = f"{away_team}@{home_team}"
+    else:
+        away_team = ''
+        home_team = ''
+        game_id = _normalize_team_abbreviation(game_str)
+    
+    return game_id, away_team, home_team
+
+
+@lru_cache(maxsize=1024)
+def _parse_expected_value_data(ev_raw: str) -> Tuple[str, str]:
+    """Parse expected value raw data into (tier, description)
+    
+    CORRECTED TIER MAPPING:
+    A Tier (Highest): plus_e_5.png
+    B Tier: plus_d_4.png  
+    C Tier: plus_c_3.png
+    D Tier: plus_b_2.png
+    E Tier (Lowest): plus_a_1.png
+    F Tier: No image (empty)
+    """
+    if not ev_raw:
+        return 'F', 'No Expected Value'
+    
+    try:
+        ev_data = json.loads(ev_raw)
+        images = ev_data.get('images', [])
+        
+        if not images:
+            return 'F', 'No Expected Value'
+        
+        # CORRECTED: Fixed tier mapping based on actual scraped data
+        match = EV_IMAGE_RE.search(images[0].get('src', ''))
+        if match:
+            return EV_IMAGE_TIERS[match.group(1)]
+        
+        return 'F', 'Unknown Expected Value'
+        
+    except Exception:
+        return 'F', 'Parse Error'
+
+
+def _close_connection(conn: sqlite3.Connection):
+    """Refresh the planner statistics the run's queries relied on, then close"""
+    conn.execute("PRAGMA optimize")
+    conn.close()
+
+
 class MLBPropsDatabase:
     """Database manager for MLB Props data"""
     
     def __init__(self, db_path: str = "mlb_props.db"):
         self.db_path = db_path
+        # One connection for the lifetime of the manager; every
+        # get_connection() block reuses it instead of reopening the file
+        self._conn = sqlite3.connect(db_path, cached_statements=STATEMENT_CACHE_SIZE)
+        self._conn.row_factory = sqlite3.Row  # Enable column access by name
+        self._conn.executescript(CONNECTION_PRAGMAS)
+        self._conn.create_function("parse_odds", 1, _parse_odds, deterministic=True)
+        # Scrape sessions in progress: session_id -> (scrape_date, start_time).
+        # The session row is only written once the session ends
+        self.running_sessions: Dict[str, tuple] = {}
         self.init_database()
+        # Closes the connection once: on close(), when the manager is garbage
+        # collected, or at exit. It holds the connection, not the manager, so
+        # it doesn't keep the instance alive
+        self._finalizer = weakref.finalize(self, _close_connection, self._conn)
 
     def normalize_team_abbreviation(self, abbr: str) -> str:
         """Return normalized 3-letter team abbreviation"""
-        if not abbr:
-            return ""
-        abbr = abbr.upper().strip()
-        return TEAM_ABBR_NORMALIZATION.get(abbr, abbr)
+        return _normalize_team_abbreviation(abbr)
     
     def init_database(self):
         """Initialize database with all required tables"""
         with self.get_connection() as conn:
+            # WAL is persistent in the database file: commits append to the log
+            # instead of rewriting the journal, and readers don't block writers
+            conn.execute("PRAGMA journal_mode=WAL")
+            
             # Create tables
             self._create_props_table(conn)
             self._create_games_table(conn)
@@ -78,13 +211,19 @@ class MLBPropsDatabase:
             self._create_box_scores_table(conn)
             self._create_player_name_mapping_table(conn)
             self._create_indexes(conn)
+            
+            # Give the planner statistics for the indexes once there is data
+            # to describe; after that PRAGMA optimize on close() keeps them current
+            if (conn.execute("SELECT 1 FROM props LIMIT 1").fetchone()
+                    and not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()):
+                conn.execute("ANALYZE")
+            
             logger.info("Database initialized successfully")
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable column access by name
+        """Context manager for a transaction on the shared connection"""
+        conn = self._conn
         try:
             yield conn
             conn.commit()
@@ -92,8 +231,14 @@ class MLBPropsDatabase:
             conn.rollback()
             logger.error(f"Database error: {e}")
             raise
-        finally:
-            conn.close()
+    
+    def optimize(self):
+        """Re-analyze the tables whose planner statistics have fallen behind"""
+        self._conn.execute("PRAGMA optimize")
+    
+    def close(self):
+        """Close the shared database connection; later calls do nothing"""
+        self._finalizer()
     
     def _create_props_table(self, conn):
         """Create main props data table"""
@@ -336,14 +481,26 @@ class MLBPropsDatabase:
     def _create_indexes(self, conn):
         """Create database indexes for performance"""
         indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_props_scrape_date ON props(scrape_date)",
+            # Newest date first, players in name order within a date: the
+            # order get_unresolved_bets returns, read without a sort step.
+            # Replaces the plain scrape_date index, whose lookups this serves
+            "DROP INDEX IF EXISTS idx_props_scrape_date",
+            "CREATE INDEX IF NOT EXISTS idx_props_scrape_date_player ON props(scrape_date DESC, player_name)",
             "CREATE INDEX IF NOT EXISTS idx_props_player_team ON props(player_name, team)",
             "CREATE INDEX IF NOT EXISTS idx_props_market ON props(market)",
             "CREATE INDEX IF NOT EXISTS idx_props_ev_tier ON props(expected_value_tier)",
             "CREATE INDEX IF NOT EXISTS idx_props_game_date ON props(date)",
-            "CREATE INDEX IF NOT EXISTS idx_games_date ON games(game_date)",
+            # Per-date tier lookups (get_props_by_tier) seek straight to the
+            # date+tier and read rows already in player_name, market order
+            "CREATE INDEX IF NOT EXISTS idx_props_date_tier ON props(scrape_date, expected_value_tier, player_name, market)",
+            "CREATE INDEX IF NOT EXISTS idx_sessions_date ON scrape_sessions(scrape_date)",
+            # (game_date, game_id) serves DISTINCT game_id lookups per date in
+            # index order and replaces the old single-column idx_games_date
+            "DROP INDEX IF EXISTS idx_games_date",
+            "CREATE INDEX IF NOT EXISTS idx_games_date_game_id ON games(game_date, game_id)",
             "CREATE INDEX IF NOT EXISTS idx_games_teams ON games(home_team, away_team)",
-            "CREATE INDEX IF NOT EXISTS idx_bet_results_prop ON bet_results(prop_id)",
+            # UNIQUE(prop_id) already indexes bet_results by prop
+            "DROP INDEX IF EXISTS idx_bet_results_prop",
             "CREATE INDEX IF NOT EXISTS idx_bet_results_resolved ON bet_results(resolved_at)",
         ]
         
@@ -352,14 +509,10 @@ class MLBPropsDatabase:
     
     def start_scrape_session(self, scrape_date: date) -> str:
         """Start a new scrape session"""
-        session_id = f"scrape_{scrape_date.isoformat()}_{datetime.now().strftime('%H%M%S')}"
+        start_time = datetime.now()
+        session_id = f"scrape_{scrape_date.isoformat()}_{start_time.strftime('%H%M%S')}"
         
-        with self.get_connection() as conn:
-            conn.execute("""
-                INSERT INTO scrape_sessions 
-                (session_id, scrape_date, start_time, status)
-                VALUES (?, ?, ?, 'running')
-            """, (session_id, scrape_date, datetime.now()))
+        self.running_sessions[session_id] = (scrape_date, start_time)
         
         logger.info(f"Started scrape session: {session_id}")
         return session_id
@@ -367,164 +520,161 @@ class MLBPropsDatabase:
     def end_scrape_session(self, session_id: str, status: str, 
                           records_scraped: int = 0, pages_processed: int = 0,
                           error_message: str = None):
-        """End a scrape session"""
+        """End a scrape session, writing its row in one statement"""
+        session = self.running_sessions.pop(session_id, None)
+        
         with self.get_connection() as conn:
-            conn.execute("""
-                UPDATE scrape_sessions 
-                SET end_time = ?, status = ?, records_scraped = ?, 
-                    pages_processed = ?, error_message = ?
-                WHERE session_id = ?
-            """, (datetime.now(), status, records_scraped, pages_processed, 
-                  error_message, session_id))
+            if session is None:
+                # Not started by this instance; update the row if it exists
+                conn.execute("""
+                    UPDATE scrape_sessions 
+                    SET end_time = ?, status = ?, records_scraped = ?, 
+                        pages_processed = ?, error_message = ?
+                    WHERE session_id = ?
+                """, (datetime.now(), status, records_scraped, pages_processed, 
+                      error_message, session_id))
+            else:
+                scrape_date, start_time = session
+                conn.execute("""
+                    INSERT INTO scrape_sessions 
+                    (session_id, scrape_date, start_time, end_time, status,
+                     records_scraped, pages_processed, error_message)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(session_id) DO UPDATE SET
+                        end_time = excluded.end_time, status = excluded.status,
+                        records_scraped = excluded.records_scraped,
+                        pages_processed = excluded.pages_processed,
+                        error_message = excluded.error_message
+                """, (session_id, scrape_date, start_time, datetime.now(), status,
+                      records_scraped, pages_processed, error_message))
         
         logger.info(f"Ended scrape session {session_id}: {status}")
     
     def insert_props_data(self, props_data: List[Dict], session_id: str) -> int:
-        """Insert props data into database"""
+        """Insert props data into database in a single batch"""
         if not props_data:
             return 0
         
-        inserted_count = 0
+        prop_rows = []
+        game_rows = {}
+        player_rows = {}
         
-        with self.get_connection() as conn:
-            for prop in props_data:
-                try:
-                    # Parse game info
-                    game_info = self._parse_game_info(prop.get('GAME', ''))
-                    
-                    # Parse expected value
-                    ev_info = self._parse_expected_value_data(prop.get('EXPECTED VALUE', ''))
-                    
-                    # Parse numeric fields
-                    batting_order = self._safe_int(prop.get('BATTING\nORDER', ''))
-                    implied_proj = self._safe_float(prop.get('IMPLIED\nPROJECTION', ''))
-                    batx_proj = self._safe_float(prop.get('THE BAT X\nPROJECTION', ''))
-                    pitch_count = self._safe_int(prop.get('THE BAT X\nPITCH COUNT', ''))
-                    
-                    # Insert prop record
-                    conn.execute("""
-                        INSERT OR REPLACE INTO props (
-                            scrape_date, scrape_timestamp, scrape_session_id,
-                            game_id, date, time, home_team, away_team,
-                            player_name, team, position, batting_order,
-                            site, market, over_line, under_line, line_move,
-                            implied_projection, batx_projection, implied_vs_batx_diff, suggested_bet,
-                            expected_value_raw, expected_value_tier, expected_value_description,
-                            status, official_lineup, pitch_count_checked, batx_pitch_count,
-                            page_number, row_number
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        prop.get('scrape_timestamp', '')[:10],  # Extract date
-                        prop.get('scrape_timestamp', ''),
-                        session_id,
-                        game_info['game_id'],
+        for prop in props_data:
+            try:
+                # Parse game info
+                game_id, away_team, home_team = _parse_game_info(prop.get('GAME', ''))
+                
+                # Parse expected value
+                ev_tier, ev_description = _parse_expected_value_data(prop.get('EXPECTED VALUE', ''))
+                
+                # Parse numeric fields
+                batting_order = self._safe_int(prop.get('BATTING\nORDER', ''))
+                implied_proj = self._safe_float(prop.get('IMPLIED\nPROJECTION', ''))
+                batx_proj = self._safe_float(prop.get('THE BAT X\nPROJECTION', ''))
+                pitch_count = self._safe_int(prop.get('THE BAT X\nPITCH COUNT', ''))
+                team = self.normalize_team_abbreviation(prop.get('TM', ''))
+                
+                prop_rows.append((
+                    prop.get('scrape_timestamp', '')[:10],  # Extract date
+                    prop.get('scrape_timestamp', ''),
+                    session_id,
+                    game_id,
+                    prop.get('DATE', ''),
+                    prop.get('TIME', ''),
+                    home_team,
+                    away_team,
+                    prop.get('PLAYER', ''),
+                    team,
+                    prop.get('POSITION', ''),
+                    batting_order,
+                    prop.get('SITE', ''),
+                    prop.get('MARKET', ''),
+                    prop.get('OVER', ''),
+                    prop.get('UNDER', ''),
+                    prop.get('LINE MOVE', ''),
+                    implied_proj,
+                    batx_proj,
+                    prop.get('IMPLIED VS BATX\n% DIFFERENCE', ''),
+                    prop.get('SUGGESTED\nBET', ''),
+                    prop.get('EXPECTED VALUE', ''),
+                    ev_tier,
+                    ev_description,
+                    prop.get('STATUS', ''),
+                    prop.get('OFFICAL\nLINEUP', '') != '',
+                    prop.get('PITCH COUNT\nCHECKED', '') != '',
+                    pitch_count,
+                    prop.get('page_number', 0),
+                    prop.get('row_number', 0)
+                ))
+                
+                # Games and players are insert-if-missing, so only the first
+                # sighting of each one matters
+                if game_id:
+                    game_rows.setdefault(game_id, (
+                        game_id,
                         prop.get('DATE', ''),
                         prop.get('TIME', ''),
-                        game_info['home_team'],
-                        game_info['away_team'],
-                        prop.get('PLAYER', ''),
-                        self.normalize_team_abbreviation(prop.get('TM', '')),
-                        prop.get('POSITION', ''),
-                        batting_order,
-                        prop.get('SITE', ''),
-                        prop.get('MARKET', ''),
-                        prop.get('OVER', ''),
-                        prop.get('UNDER', ''),
-                        prop.get('LINE MOVE', ''),
-                        implied_proj,
-                        batx_proj,
-                        prop.get('IMPLIED VS BATX\n% DIFFERENCE', ''),
-                        prop.get('SUGGESTED\nBET', ''),
-                        prop.get('EXPECTED VALUE', ''),
-                        ev_info['tier'],
-                        ev_info['description'],
-                        prop.get('STATUS', ''),
-                        prop.get('OFFICAL\nLINEUP', '') != '',
-                        prop.get('PITCH COUNT\nCHECKED', '') != '',
-                        pitch_count,
-                        prop.get('page_number', 0),
-                        prop.get('row_number', 0)
+                        home_team,
+                        away_team
                     ))
-                    
-                    # Insert game if not exists
-                    if game_info['game_id']:
-                        self._insert_game_if_not_exists(conn, game_info, prop.get('DATE', ''), prop.get('TIME', ''))
-
-                    # Insert player if not exists
-                    self._insert_player_if_not_exists(
-                        conn,
-                        prop.get('PLAYER', ''),
-                        self.normalize_team_abbreviation(prop.get('TM', '')),
-                        prop.get('POSITION', '')
-                    )
-                    
-                    inserted_count += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error inserting prop: {e}")
-                    logger.debug(f"Prop data: {prop}")
-                    continue
-        
-        logger.info(f"Inserted {inserted_count} props records")
-        return inserted_count
-    
-    def _parse_game_info(self, game_str: str) -> Dict[str, str]:
-        """Parse game string like 'LAD@COL' into components"""
-        if '@' in game_str:
-            parts = game_str.split('@')
-            away_team = self.normalize_team_abbreviation(parts[0].strip())
-            home_team = self.normalize_team_abbreviation(parts[1].strip())
-            game_id = f"{away_team}@{home_team}"
-        else:
-            away_team = ''
-            home_team = ''
-            game_id = self.normalize_team_abbreviation(game_str)
-        
-        return {
-            'game_id': game_id,
-            'away_team': away_team,
-            'home_team': home_team
-        }
-    
-    def _parse_expected_value_data(self, ev_raw: str) -> Dict[str, str]:
-        """Parse expected value raw data into tier and description
-        
-        CORRECTED TIER MAPPING:
-        A Tier (Highest): plus_e_5.png
-        B Tier: plus_d_4.png  
-        C Tier: plus_c_3.png
-        D Tier: plus_b_2.png
-        E Tier (Lowest): plus_a_1.png
-        F Tier: No image (empty)
-        """
-        if not ev_raw:
-            return {'tier': 'F', 'description': 'No Expected Value'}
+                
+                if prop.get('PLAYER', '') and team:
+                    player_rows.setdefault((prop['PLAYER'], team), (prop['PLAYER'], team, prop.get('POSITION', '')))
+                
+            except Exception as e:
+                logger.error(f"Error inserting prop: {e}")
+                logger.debug(f"Prop data: {prop}")
+                continue
         
-        try:
-            ev_data = json.loads(ev_raw)
-            images = ev_data.get('images', [])
-            
-            if not images:
-                return {'tier': 'F', 'description': 'No Expected Value'}
-            
-            src = images[0].get('src', '')
-            
-            # CORRECTED: Fixed tier mapping based on actual scraped data
-            if 'plus_e' in src:  # plus_e_5.png
-                return {'tier': 'A', 'description': 'Excellent Expected Value'}
-            elif 'plus_d' in src:  # plus_d_4.png
-                return {'tier': 'B', 'description': 'Very Good Expected Value'}
-            elif 'plus_c' in src:  # plus_c_3.png
-                return {'tier': 'C', 'description': 'Good Expected Value'}
-            elif 'plus_b' in src:  # plus_b_2.png
-                return {'tier': 'D', 'description': 'Fair Expected Value'}
-            elif 'plus_a' in src:  # plus_a_1.png
-                return {'tier': 'E', 'description': 'Lower Expected Value'}
+        # One executemany per table in one transaction instead of three
+        # statements per prop. A re-scraped prop is updated in place, so it
+        # keeps its id and any bet_results rows pointing at it stay linked
+        with self.get_connection() as conn:
+            conn.executemany("""
+                INSERT INTO props (
+                    scrape_date, scrape_timestamp, scrape_session_id,
+                    game_id, date, time, home_team, away_team,
+                    player_name, team, position, batting_order,
+                    site, market, over_line, under_line, line_move,
+                    implied_projection, batx_projection, implied_vs_batx_diff, suggested_bet,
+                    expected_value_raw, expected_value_tier, expected_value_description,
+                    status, official_lineup, pitch_count_checked, batx_pitch_count,
+                    page_number, row_number
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(scrape_date, player_name, team, market, site) DO UPDATE SET
+                    scrape_timestamp = excluded.scrape_timestamp,
+                    scrape_session_id = excluded.scrape_session_id,
+                    game_id = excluded.game_id, date = excluded.date, time = excluded.time,
+                    home_team = excluded.home_team, away_team = excluded.away_team,
+                    position = excluded.position, batting_order = excluded.batting_order,
+                    over_line = excluded.over_line, under_line = excluded.under_line,
+                    line_move = excluded.line_move,
+                    implied_projection = excluded.implied_projection,
+                    batx_projection = excluded.batx_projection,
+                    implied_vs_batx_diff = excluded.implied_vs_batx_diff,
+                    suggested_bet = excluded.suggested_bet,
+                    expected_value_raw = excluded.expected_value_raw,
+                    expected_value_tier = excluded.expected_value_tier,
+                    expected_value_description = excluded.expected_value_description,
+                    status = excluded.status, official_lineup = excluded.official_lineup,
+                    pitch_count_checked = excluded.pitch_count_checked,
+                    batx_pitch_count = excluded.batx_pitch_count,
+                    page_number = excluded.page_number, row_number = excluded.row_number
+            """, prop_rows)
             
-            return {'tier': 'F', 'description': 'Unknown Expected Value'}
+            conn.executemany("""
+                INSERT OR IGNORE INTO games (game_id, game_date, game_time, home_team, away_team)
+                VALUES (?, ?, ?, ?, ?)
+            """, game_rows.values())
             
-        except Exception:
-            return {'tier': 'F', 'description': 'Parse Error'}
+            conn.executemany("""
+                INSERT OR IGNORE INTO players (player_name, team, position)
+                VALUES (?, ?, ?)
+            """, player_rows.values())
+        
+        inserted_count = len(prop_rows)
+        logger.info(f"Inserted {inserted_count} props records")
+        return inserted_count
     
     def _safe_int(self, value: str) -> Optional[int]:
         """Safely convert string to int"""
@@ -540,27 +690,6 @@ class MLBPropsDatabase:
         except ValueError:
             return None
     
-    def _insert_game_if_not_exists(self, conn, game_info: Dict, date_str: str, time_str: str):
-        """Insert game record if it doesn't exist"""
-        conn.execute("""
-            INSERT OR IGNORE INTO games (game_id, game_date, game_time, home_team, away_team)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            game_info['game_id'],
-            date_str,
-            time_str,
-            self.normalize_team_abbreviation(game_info['home_team']),
-            self.normalize_team_abbreviation(game_info['away_team'])
-        ))
-    
-    def _insert_player_if_not_exists(self, conn, player_name: str, team: str, position: str):
-        """Insert player record if it doesn't exist"""
-        if player_name and team:
-            conn.execute("""
-                INSERT OR IGNORE INTO players (player_name, team, position)
-                VALUES (?, ?, ?)
-            """, (player_name, self.normalize_team_abbreviation(team), position))
-    
     def get_daily_summary(self, scrape_date: date) -> Dict[str, Any]:
         """Get summary of daily scrape data"""
         with self.get_connection() as conn:
@@ -581,14 +710,16 @@ class MLBPropsDatabase:
             result = cursor.fetchone()
             return dict(result) if result else {}
     
-    def get_props_by_tier(self, scrape_date: date, tier: str) -> List[Dict]:
-        """Get props filtered by expected value tier"""
+    def get_props_by_tier(self, scrape_date: date, tier: str, limit: Optional[int] = None) -> List[Dict]:
+        """Get props filtered by expected value tier, optionally only the first limit"""
         with self.get_connection() as conn:
+            # LIMIT -1 is SQLite for no limit
             cursor = conn.execute("""
                 SELECT * FROM props 
                 WHERE scrape_date = ? AND expected_value_tier = ?
                 ORDER BY player_name, market
-            """, (scrape_date, tier))
+                LIMIT ?
+            """, (scrape_date, tier, -1 if limit is None else limit))
             
             return [dict(row) for row in cursor.fetchall()]
     
@@ -658,7 +789,7 @@ class MLBPropsDatabase:
             def parse_line(value: str) -> Optional[float]:
                 if not value:
                     return None
-                match = re.search(r"-?\d+(?:\.\d+)?", value)
+                match = LINE_NUMBER_RE.search(value)
                 return float(match.group()) if match else None
 
             over_num = parse_line(over_line)
@@ -722,121 +853,75 @@ class MLBPropsDatabase:
 
     def get_daily_bet_results_summary(self, target_date: date) -> Dict[str, Any]:
         """Return summary of bet results for a specific date including P/L"""
-
-        def parse_odds(odds_string: str) -> Optional[int]:
-            if not odds_string or odds_string.strip() == "":
-                return None
-            match = re.search(r"\(([+-]\d+)\)", odds_string)
-            if match:
-                try:
-                    return int(match.group(1))
-                except ValueError:
-                    return None
-            match = re.search(r"^([+-]\d+)$", odds_string.strip())
-            if match:
-                try:
-                    return int(match.group(1))
-                except ValueError:
-                    return None
-            return None
-
-        def calculate_suggested_stake(odds_value: int) -> Optional[float]:
-            if odds_value is None:
-                return None
-            if odds_value > 0:
-                if 100 <= odds_value <= 250:
-                    return 100.0
-                if 250 < odds_value <= 500:
-                    return 50.0
-                if 500 < odds_value <= 750:
-                    return 25.0
-                if odds_value > 750:
-                    return 15.0
-                return 100.0
-            if odds_value < 0:
-                return float(abs(odds_value))
-            return None
-
-        def calculate_profit_loss(odds_value: int, stake: float, bet_won: bool) -> Optional[float]:
-            if odds_value is None or stake is None or bet_won is None:
-                return None
-            if bet_won:
-                if odds_value > 0:
-                    return (odds_value / 100) * stake
-                return (100 / abs(odds_value)) * stake
-            return -stake
-
         with self.get_connection() as conn:
+            # The odds, stake and P/L of each suggested bet are worked out and
+            # totalled per tier in SQL; only one row per tier comes back.
+            # Odds are read by parse_odds (_parse_odds). Stakes follow the tiered
+            # schedule (100 up to +250, 50 to +500, 25 to +750, 15 above; risk
+            # to win 100 on favourites); bets without usable odds are skipped
             cursor = conn.execute(
                 """
+                WITH picks AS (
+                    SELECT
+                        br.expected_value_tier AS tier,
+                        CASE br.suggested_bet WHEN 'OVER' THEN br.over_line ELSE br.under_line END AS odds_string,
+                        CASE br.suggested_bet WHEN 'OVER' THEN br.over_result ELSE br.under_result END AS result
+                    FROM bet_results br
+                    JOIN props p ON br.prop_id = p.id
+                    WHERE p.scrape_date = ? AND br.suggested_bet IN ('OVER', 'UNDER')
+                ),
+                odds AS (
+                    SELECT tier, result, parse_odds(odds_string) AS odds_value
+                    FROM picks
+                ),
+                bets AS (
+                    SELECT
+                        tier,
+                        result,
+                        odds_value,
+                        CASE
+                            WHEN odds_value > 0 THEN
+                                CASE
+                                    WHEN odds_value <= 250 THEN 100.0
+                                    WHEN odds_value <= 500 THEN 50.0
+                                    WHEN odds_value <= 750 THEN 25.0
+                                    ELSE 15.0
+                                END
+                            WHEN odds_value < 0 THEN -odds_value * 1.0
+                        END AS stake
+                    FROM odds
+                )
                 SELECT
-                    br.expected_value_tier,
-                    br.suggested_bet,
-                    br.over_line,
-                    br.under_line,
-                    br.over_result,
-                    br.under_result
-                FROM bet_results br
-                JOIN props p ON br.prop_id = p.id
-                WHERE p.scrape_date = ?
+                    tier,
+                    COUNT(*) AS total_bets,
+                    COUNT(*) FILTER (WHERE result = 'win') AS wins,
+                    COUNT(*) FILTER (WHERE result IS NOT 'win' AND result IS NOT 'push') AS losses,
+                    COUNT(*) FILTER (WHERE result = 'push') AS pushes,
+                    SUM(stake) AS total_staked,
+                    SUM(CASE result
+                            WHEN 'push' THEN 0.0
+                            WHEN 'win' THEN
+                                CASE WHEN odds_value > 0 THEN (odds_value / 100.0) * stake
+                                     ELSE (100.0 / abs(odds_value)) * stake
+                                END
+                            ELSE -stake
+                        END) AS total_profit_loss
+                FROM bets
+                WHERE stake IS NOT NULL
+                GROUP BY tier
+                ORDER BY tier
             """,
                 (target_date,),
             )
 
-            rows = [dict(row) for row in cursor.fetchall()]
+            tier_breakdown = [dict(row) for row in cursor.fetchall()]
 
-        total_bets = 0
-        wins = 0
-        losses = 0
-        pushes = 0
-        total_staked = 0.0
-        total_profit_loss = 0.0
-        tier_data: Dict[str, Dict[str, Any]] = {}
-
-        for row in rows:
-            suggested_bet = row.get("suggested_bet")
-            if suggested_bet not in ("OVER", "UNDER"):
-                continue
-            odds_str = row["over_line"] if suggested_bet == "OVER" else row["under_line"]
-            result = row["over_result"] if suggested_bet == "OVER" else row["under_result"]
-            odds_value = parse_odds(odds_str)
-            stake = calculate_suggested_stake(odds_value)
-            if stake is None:
-                continue
-            bet_push = result == "push"
-            bet_won = result == "win"
-            profit_loss = 0.0 if bet_push else calculate_profit_loss(odds_value, stake, bet_won)
-
-            tier = row.get("expected_value_tier", "?")
-            data = tier_data.setdefault(
-                tier,
-                {
-                    "tier": tier,
-                    "total_bets": 0,
-                    "wins": 0,
-                    "losses": 0,
-                    "pushes": 0,
-                    "total_staked": 0.0,
-                    "total_profit_loss": 0.0,
-                },
-            )
-
-            data["total_bets"] += 1
-            if bet_won:
-                wins += 1
-                data["wins"] += 1
-            elif bet_push:
-                pushes += 1
-                data["pushes"] += 1
-            else:
-                losses += 1
-                data["losses"] += 1
-
-            total_bets += 1
-            total_staked += stake
-            total_profit_loss += profit_loss
-            data["total_staked"] += stake
-            data["total_profit_loss"] += profit_loss
+        total_bets = sum(t["total_bets"] for t in tier_breakdown)
+        wins = sum(t["wins"] for t in tier_breakdown)
+        losses = sum(t["losses"] for t in tier_breakdown)
+        pushes = sum(t["pushes"] for t in tier_breakdown)
+        total_staked = sum((t["total_staked"] for t in tier_breakdown), 0.0)
+        total_profit_loss = sum((t["total_profit_loss"] for t in tier_breakdown), 0.0)
 
         summary = {
             "total_bets": total_bets,
@@ -850,90 +935,82 @@ class MLBPropsDatabase:
             "overall_roi": round((total_profit_loss / total_staked) * 100, 1) if total_staked else 0,
         }
 
-        tier_breakdown = []
-        for tier in sorted(tier_data.keys()):
-            t = tier_data[tier]
+        for t in tier_breakdown:
             t["win_rate"] = round((t["wins"] / t["total_bets"]) * 100, 1) if t["total_bets"] else 0
             t["roi"] = round((t["total_profit_loss"] / t["total_staked"]) * 100, 1) if t["total_staked"] else 0
             t["total_staked"] = round(t["total_staked"], 2)
             t["total_profit_loss"] = round(t["total_profit_loss"], 2)
-            tier_breakdown.append(t)
 
         summary["tier_breakdown"] = tier_breakdown
 
         return summary
     
     def insert_box_score_data(self, box_scores: List[Dict]) -> int:
-        """Insert box score data into database"""
+        """Insert box score data into database in a single batch"""
         if not box_scores:
             return 0
         
-        inserted_count = 0
+        rows = [
+            (
+                score.get('game_id'),
+                score.get('game_date'),
+                score.get('player_name'),
+                score.get('team'),
+                score.get('game_status'),
+                score.get('game_completed', False),
+                score.get('at_bats', 0),
+                score.get('hits', 0),
+                score.get('runs', 0),
+                score.get('rbi', 0),
+                score.get('home_runs', 0),
+                score.get('doubles', 0),
+                score.get('triples', 0),
+                score.get('singles', 0),
+                score.get('walks', 0),
+                score.get('strikeouts', 0),
+                score.get('stolen_bases', 0),
+                score.get('caught_stealing', 0),
+                score.get('total_bases', 0),
+                score.get('innings_pitched', 0.0),
+                score.get('pitching_outs', 0),
+                score.get('hits_allowed', 0),
+                score.get('earned_runs', 0),
+                score.get('walks_allowed', 0),
+                score.get('strikeouts_pitched', 0),
+                score.get('home_runs_allowed', 0),
+                score.get('fielding_assists', 0),
+                score.get('fielding_putouts', 0),
+                score.get('fielding_errors', 0),
+                score.get('position'),
+                score.get('batting_order'),
+                score.get('data_source', 'unknown'),
+                score.get('data_confidence', 1.0)
+            )
+            for score in box_scores
+        ]
         
+        # One executemany in one transaction instead of a statement per player
         with self.get_connection() as conn:
-            for score in box_scores:
-                try:
-                    conn.execute("""
-                        INSERT OR REPLACE INTO box_scores (
-                            game_id, game_date, player_name, team,
-                            game_status, game_completed,
-                            at_bats, hits, runs, rbi, home_runs, doubles, triples, singles,
-                            walks, strikeouts, stolen_bases, caught_stealing, total_bases,
-                            innings_pitched, pitching_outs, hits_allowed, earned_runs,
-                            walks_allowed, strikeouts_pitched, home_runs_allowed,
-                            fielding_assists, fielding_putouts, fielding_errors,
-                            position, batting_order, data_source, data_confidence,
-                            collected_at, updated_at
-                        ) VALUES (
-                            ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
-                            ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
-                            ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
-                        )
-                    """, (
-                        score.get('game_id'),
-                        score.get('game_date'),
-                        score.get('player_name'),
-                        score.get('team'),
-                        score.get('game_status'),
-                        score.get('game_completed', False),
-                        score.get('at_bats', 0),
-                        score.get('hits', 0),
-                        score.get('runs', 0),
-                        score.get('rbi', 0),
-                        score.get('home_runs', 0),
-                        score.get('doubles', 0),
-                        score.get('triples', 0),
-                        score.get('singles', 0),
-                        score.get('walks', 0),
-                        score.get('strikeouts', 0),
-                        score.get('stolen_bases', 0),
-                        score.get('caught_stealing', 0),
-                        score.get('total_bases', 0),
-                        score.get('innings_pitched', 0.0),
-                        score.get('pitching_outs', 0),
-                        score.get('hits_allowed', 0),
-                        score.get('earned_runs', 0),
-                        score.get('walks_allowed', 0),
-                        score.get('strikeouts_pitched', 0),
-                        score.get('home_runs_allowed', 0),
-                        score.get('fielding_assists', 0),
-                        score.get('fielding_putouts', 0),
-                        score.get('fielding_errors', 0),
-                        score.get('position'),
-                        score.get('batting_order'),
-                        score.get('data_source', 'unknown'),
-                        score.get('data_confidence', 1.0)
-                    ))
-                    
-                    inserted_count += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error inserting box score: {e}")
-                    logger.debug(f"Box score data: {score}")
-                    continue
+            conn.executemany("""
+                INSERT OR REPLACE INTO box_scores (
+                    game_id, game_date, player_name, team,
+                    game_status, game_completed,
+                    at_bats, hits, runs, rbi, home_runs, doubles, triples, singles,
+                    walks, strikeouts, stolen_bases, caught_stealing, total_bases,
+                    innings_pitched, pitching_outs, hits_allowed, earned_runs,
+                    walks_allowed, strikeouts_pitched, home_runs_allowed,
+                    fielding_assists, fielding_putouts, fielding_errors,
+                    position, batting_order, data_source, data_confidence,
+                    collected_at, updated_at
+                ) VALUES (
+                    ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                    ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                    ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                )
+            """, rows)
         
-        logger.info(f"Inserted {inserted_count} box score records")
-        return inserted_count
+        logger.info(f"Inserted {len(rows)} box score records")
+        return len(rows)
     
     def get_box_scores_for_date(self, target_date: date) -> List[Dict]:
         """Get all box scores for a specific date"""
@@ -10,6 +10,12 @@ import math
 
 logger = logging.getLogger(__name__)
 
+# American odds in parentheses, e.g. "2.5 (-110)"
+PAREN_ODDS_RE = re.compile(r'\(([+-]?\d+)\)')
+
+# First number in a line string, e.g. the 0.5 in "0.5 (+150)"
+LINE_VALUE_RE = re.compile(r'([0-9]*\.?[0-9]+)')
+
 
 class EnhancedEVCalculator:
     """Calculate proper expected value from projections and odds"""
@@ -28,7 +34,7 @@ class EnhancedEVCalculator:
             return None
             
         # First check for odds inside parentheses like "2.5 (-110)"
-        match = re.search(r'\(([+-]?\d+)\)', odds_string)
+        match = PAREN_ODDS_RE.search(odds_string)
         if match:
             odds_clean = match.group(1)
         else:
@@ -214,7 +220,7 @@ class EnhancedEVCalculator:
             return None
         
         # Extract the first number before any parentheses or other characters
-        match = re.search(r'([0-9]*\.?[0-9]+)', line_string.strip())
+        match = LINE_VALUE_RE.search(line_string.strip())
         if match:
             try:
                 return float(match.group(1))
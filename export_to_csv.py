@@ -9,7 +9,7 @@ cursor = conn.cursor()
 # Define the query to select the plays for today
 today = datetime.now().strftime('%Y-%m-%d')
 query = """
-SELECT * FROM props WHERE DATE(scrape_date) = ?
+SELECT * FROM props WHERE scrape_date = ?
 """
 
 # Execute the query
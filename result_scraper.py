@@ -4,15 +4,29 @@ Bet Result Scraper
 Fetches actual game statistics to resolve bet outcomes
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import logging
 from datetime import datetime, date, timedelta
 from typing import Dict, List, Optional, Any
-import time
+from concurrent.futures import ThreadPoolExecutor
 from database import MLBPropsDatabase
 
+try:
+    # orjson parses the large schedule/scoreboard payloads several times faster
+    import orjson
+    _loads_json = orjson.loads
+except ImportError:
+    _loads_json = json.loads
+
 logger = logging.getLogger(__name__)
 
+# Games whose statistics are fetched at the same time. Each lookup is a few
+# blocking HTTP round-trips, so threads overlap the waits; the bets are still
+# resolved and written from the calling thread
+MAX_CONCURRENT_GAMES = 5
+
 
 class MLBResultScraper:
     """Scrapes MLB game results and player statistics for bet resolution"""
@@ -21,8 +35,18 @@ class MLBResultScraper:
         self.db = db
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept-Encoding': 'gzip'
         })
+        # Reuse connections to the MLB/ESPN hosts and retry transient API
+        # failures instead of leaving the bet unresolved
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.3,
+                              status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount('https://', adapter)
     
     def resolve_bets_for_date(self, target_date: date) -> Dict[str, Any]:
         """Resolve all bets for a specific date"""
@@ -50,35 +74,40 @@ class MLBResultScraper:
         error_count = 0
         games_processed = 0
         
-        for game_id, game_bets in games_bets.items():
-            try:
-                logger.info(f"Processing game {game_id} with {len(game_bets)} bets")
-                
-                # Get game statistics
-                game_stats = self.get_game_statistics(game_id, target_date)
-                
-                if not game_stats:
-                    logger.warning(f"No statistics found for game {game_id}")
-                    continue
-                
-                # Resolve each bet in this game
-                for bet in game_bets:
-                    try:
-                        result = self.resolve_single_bet(bet, game_stats)
-                        if result:
-                            resolved_count += 1
-                        else:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_GAMES) as executor:
+            # Get game statistics for every game up front
+            stats_futures = {
+                game_id: executor.submit(self.get_game_statistics, game_id, target_date)
+                for game_id in games_bets
+            }
+            
+            for game_id, game_bets in games_bets.items():
+                try:
+                    logger.info(f"Processing game {game_id} with {len(game_bets)} bets")
+                    
+                    game_stats = stats_futures[game_id].result()
+                    
+                    if not game_stats:
+                        logger.warning(f"No statistics found for game {game_id}")
+                        continue
+                    
+                    # Resolve each bet in this game
+                    for bet in game_bets:
+                        try:
+                            result = self.resolve_single_bet(bet, game_stats)
+                            if result:
+                                resolved_count += 1
+                            else:
+                                error_count += 1
+                        except Exception as e:
+                            logger.error(f"Error resolving bet {bet['id']}: {e}")
                             error_count += 1
-                    except Exception as e:
-                        logger.error(f"Error resolving bet {bet['id']}: {e}")
-                        error_count += 1
-                
-                games_processed += 1
-                time.sleep(1)  # Rate limiting
-                
-            except Exception as e:
-                logger.error(f"Error processing game {game_id}: {e}")
-                error_count += len(game_bets)
+                    
+                    games_processed += 1
+                    
+                except Exception as e:
+                    logger.error(f"Error processing game {game_id}: {e}")
+                    error_count += len(game_bets)
         
         logger.info(f"Resolution complete: {resolved_count} resolved, {error_count} errors, {games_processed} games processed")
         
@@ -142,7 +171,7 @@ class MLBResultScraper:
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
             
-            data = response.json()
+            data = _loads_json(response.content)
             
             # Find the specific game
             for game in data.get('events', []):
@@ -238,7 +267,7 @@ class MLBResultScraper:
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
             
-            data = response.json()
+            data = _loads_json(response.content)
             
             # Find matching game and extract player stats
             for game_date_info in data.get('dates', []):
@@ -96,8 +96,13 @@ def login_simple(driver):
 
 def scrape_basic():
     """Basic scraping approach with minimal complexity"""
+    return list(iter_scraped_rows())
+
+
+def iter_scraped_rows():
+    """Scrape the models table, yielding each row as soon as it is read"""
     driver = None
-    all_data = []
+    row_total = 0
 
     try:
         # Initialize browser
@@ -106,7 +111,7 @@ def scrape_basic():
         # Login
         if not login_simple(driver):
             logger.error("Login failed - stopping")
-            return []
+            return
 
         # Navigate to models page
         logger.info("Navigating to models page...")
@@ -184,7 +189,8 @@ def scrape_basic():
                 row_data['scrape_timestamp'] = datetime.now().isoformat()
                 row_data['page_number'] = page_num
 
-                all_data.append(row_data)
+                row_total += 1
+                yield row_data
 
             # Check if we've reached the final page
             if row_count < 250:
@@ -209,7 +215,7 @@ def scrape_basic():
                 logger.debug(f"Page source preview: {driver.page_source[:1000]}")
                 break
 
-        logger.info(f"Scraping completed. Total rows: {len(all_data)}")
+        logger.info(f"Scraping completed. Total rows: {row_total}")
 
     except Exception as e:
         logger.error(f"Scraper failed: {e}")
@@ -219,8 +225,6 @@ def scrape_basic():
             driver.quit()
             logger.info("Browser closed")
 
-    return all_data
-
 
 def parse_expected_value(ev_data):
     """Parse Expected Value information from image source URLs"""